@@ -0,0 +1,64 @@
+"""Time tab completion at the todo prompt against a large todo list.
+
+Run with `python -m benchmarks.bench_completion`. The `TaskIndex` the todo prompt
+builds is filled from a synthetic `TodoDB`, then each completion below and adding
+then removing one task is timed. The run fails if any of them takes longer
+than `BUDGET_MS`, which would be noticeable on a keypress.
+"""
+
+from __future__ import annotations
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typing as tp
+
+from benchmarks import synthetic
+from completion import TaskIndex
+from todo_db import TodoDB
+
+N_TASKS = 100_000
+BUDGET_MS = 2.0
+PREFIXES = ["", "1", "123", "99999", "task", "task 3.1", "TASK 2.", "zzz"]
+
+
+def _best_ms(func: tp.Callable[[], tp.Any], repeat: int = 20) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = Path(tmp) / "todo.db"
+        synthetic.write_todo_db(fp, N_TASKS)
+        with TodoDB(fp) as db:
+            start = time.perf_counter()
+            index = TaskIndex(db.open_descriptions())
+            elapsed = time.perf_counter() - start
+    print(f"{'build':>10}: {elapsed * 1000:8.2f} ms  {len(index.descriptions)} tasks")
+
+    new_id = max(index.descriptions) + 1
+    cases: dict[str, tp.Callable[[], tp.Any]] = {
+        repr(prefix): (lambda prefix=prefix: index.complete(prefix))
+        for prefix in PREFIXES
+    }
+    cases["add+remove"] = lambda: (
+        index.add(new_id, "task bench"),
+        index.remove(new_id),
+    )
+    for name, func in cases.items():
+        ms = _best_ms(func)
+        ok = ms <= BUDGET_MS
+        failed |= not ok
+        print(f"{name:>10}: {ms:8.3f} ms  {'ok' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
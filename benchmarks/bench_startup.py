@@ -0,0 +1,57 @@
+"""Import-time budget for one-shot `hourly_2.py <text>` logging.
+
+Run with `python -m benchmarks.bench_startup`. Fails if the one-shot path
+imports SQLAlchemy or readline, or if its imports take longer than the budget.
+"""
+
+from __future__ import annotations
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+# interpreter startup alone (site, encodings, typing, pathlib) is ~30 ms here;
+# importing SQLAlchemy would add several times that
+BUDGET_MS = 60.0
+FORBIDDEN = ("sqlalchemy", "readline", "todo_db", "todo_config")
+
+
+def one_shot_import_times(text: str = "benchmark entry") -> dict[str, int]:
+    """Run `hourly_2.py <text>` under `-X importtime`, returning self time per module in us."""
+    with tempfile.TemporaryDirectory() as home:
+        (Path(home) / "vault/logs").mkdir(parents=True)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", str(REPO / "hourly_2.py"), text],
+            env={**os.environ, "HOME": home},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(self_us)
+    return times
+
+
+def main() -> int:
+    times = one_shot_import_times()
+    total_ms = sum(times.values()) / 1000
+    print(f"one-shot log: {len(times)} modules imported in {total_ms:.1f} ms")
+    failed = False
+    for module in times:
+        if module.split(".")[0] in FORBIDDEN:
+            print(f"FAIL: one-shot path imported {module}")
+            failed = True
+    if total_ms > BUDGET_MS:
+        print(f"FAIL: over budget of {BUDGET_MS:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
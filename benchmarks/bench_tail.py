@@ -0,0 +1,64 @@
+"""Regression benchmark for `hourly.get_last_day` on a synthetic 100 MB log.
+
+Run with `python -m benchmarks.bench_tail`.
+"""
+
+from __future__ import annotations
+import datetime
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import hourly
+
+TARGET_BYTES = 100 * 2**20
+# the last day is a few KB, so anything near a full read is a regression
+BUDGET_SECONDS = 0.05
+
+
+def write_synthetic_log(path: Path, target_bytes: int = TARGET_BYTES) -> None:
+    day = datetime.date(2000, 1, 1)
+    size = 0
+    with open(path, mode="w") as f:
+        while size < target_bytes:
+            lines = [f"-----{day:%m/%d/%Y (%A)}----- note\n", "in 09:00\n"]
+            lines += [f"[ ] todo {i} # 09:{i:02}\n" for i in range(5)]
+            lines += [
+                f"{h}:{m:02} - worked on thing {h}{m}\n"
+                for h in range(9, 18)
+                for m in (0, 30)
+            ]
+            chunk = "".join(lines)
+            f.write(chunk)
+            size += len(chunk)
+            day += datetime.timedelta(days=1)
+
+
+def _timeit(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "hourly_out.md"
+        write_synthetic_log(path)
+        hourly.log_path = str(path)
+        elapsed = _timeit(hourly.get_last_day)
+        n_todos = len(hourly.get_todos())
+    print(
+        f"get_last_day on {TARGET_BYTES / 2**20:.0f} MB: {elapsed * 1000:.2f} ms ({n_todos} todos)"
+    )
+    if elapsed > BUDGET_SECONDS:
+        print(f"FAIL: over budget of {BUDGET_SECONDS * 1000:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""SQL statement counts, commit latency and cold start for `TodoDB`.
+
+Run with `python -m benchmarks.bench_todo_db`. The run fails if `load_tree`
+sends more than `LOAD_TREE_BUDGET` statements.
+"""
+
+from __future__ import annotations
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import event
+
+import todo_db
+from todo_db import Base, EngineProfile, Task, TodoDB
+
+N_ROOTS = 300
+FAN_OUT = 3
+DEPTH = 3
+N_COMMITS = 200
+LOAD_TREE_BUDGET = 1
+
+# what `_get_sessionmaker` did before engine profiles: SQLite's defaults
+LEGACY_PROFILE = EngineProfile(
+    journal_mode="DELETE",
+    synchronous="FULL",
+    mmap_size=0,
+    cache_size=-2000,
+    busy_timeout=0,
+)
+
+
+def populate(db: TodoDB, n_roots: int = N_ROOTS) -> None:
+    level = [db.add_task(f"root {i}") for i in range(n_roots)]
+    db.session.flush()
+    for depth in range(1, DEPTH):
+        level = [
+            db.add_task(f"task {depth}.{parent.id}.{i}", parent_id=parent.id)
+            for parent in level
+            for i in range(FAN_OUT)
+        ]
+        db.session.flush()
+    db.commit()
+
+
+@contextmanager
+def count_statements(db: TodoDB):
+    counter = [0]
+
+    def on_execute(*_):
+        counter[0] += 1
+
+    engine = db.session.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def _measure(db: TodoDB, render) -> tuple[int, float]:
+    db.session.expire_all()
+    with count_statements(db) as counter:
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+    return counter[0], elapsed
+
+
+def bench_commits(tmp: Path) -> None:
+    for name, profile in [
+        ("legacy", LEGACY_PROFILE),
+        ("default", todo_db.DEFAULT_PROFILE),
+    ]:
+        with TodoDB(tmp / f"commits_{name}.db", profile=profile) as db:
+            start = time.perf_counter()
+            for i in range(N_COMMITS):
+                db.add_task(f"task {i}")
+                db.commit()
+            elapsed = time.perf_counter() - start
+        print(f"{name:>14} profile: {elapsed / N_COMMITS * 1e6:8.1f} us per commit")
+
+
+def bench_cold_start(tmp: Path) -> None:
+    fp = tmp / "cold.db"
+    with TodoDB(fp) as db:
+        populate(db, n_roots=10)
+    engine = todo_db._get_sessionmaker(fp).kw["bind"]
+    cases = {
+        "create_all": lambda: Base.metadata.create_all(engine),
+        "version check": lambda: todo_db._ensure_schema(engine),
+    }
+    for name, func in cases.items():
+        start = time.perf_counter()
+        for _ in range(20):
+            func()
+        elapsed = (time.perf_counter() - start) / 20
+        print(f"{name:>14}: {elapsed * 1000:8.2f} ms per startup schema check")
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_commits(Path(tmp))
+        bench_cold_start(Path(tmp))
+        with TodoDB(Path(tmp) / "todo.db") as db:
+            populate(db)
+            n_tasks = len(db.tasks)
+            cases = {
+                "lazy subtasks": lambda: Task.format_tree(*db.tasks),
+                "load_tree": lambda: str(db),
+            }
+            counts = {}
+            for name, render in cases.items():
+                counts[name], elapsed = _measure(db, render)
+                print(
+                    f"{name:>14}: {counts[name]:5} statements,"
+                    f" {elapsed * 1000:8.2f} ms for {n_tasks} tasks"
+                )
+    ok = counts["load_tree"] <= LOAD_TREE_BUDGET
+    print(f"{'':>14}  load_tree budget {LOAD_TREE_BUDGET}  {'ok' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Check that the hot `TodoDB` queries use the `tasks` indexes, and time them.
+
+Run with `python -m benchmarks.bench_todo_indexes`. The SQL sent by
+`TodoDB.tasks`, a lazy `Task.subtasks` load, `TodoDB.open_roots` and
+`TodoDB.load_subtree` is captured and run through `EXPLAIN QUERY PLAN`; the run
+fails if a plan doesn't name the expected index, or sorts in a temporary B-tree
+where the index should give the order. `open_roots` and `load_subtree` may sort
+their few rows.
+"""
+
+from __future__ import annotations
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typing as tp
+
+from sqlalchemy import event
+
+import todo_db
+from benchmarks import synthetic
+from todo_db import TodoDB
+
+N_TASKS = 100_000
+
+
+def capture_sql(db: TodoDB, func: tp.Callable[[], tp.Any]) -> list[tuple[str, tp.Any]]:
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.session.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return statements
+
+
+def query_plan(fp: Path, statement: str, parameters: tp.Any) -> list[str]:
+    with sqlite3.connect(fp) as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = Path(tmp) / "todo.db"
+        synthetic.write_todo_db(fp, N_TASKS)
+        with TodoDB(fp) as db:
+            root = db.session.query(todo_db.Task).filter_by(parent_id=None).first()
+            cases = {
+                "tasks": (lambda: db.tasks, "ix_tasks_done_priority", False),
+                "subtasks": (lambda: root.subtasks, "ix_tasks_parent_id", False),
+                "open_roots": (db.open_roots, "ix_tasks_parent_id", True),
+                "load_subtree": (
+                    lambda: db.load_subtree(root.id),
+                    "ix_tasks_path",
+                    True,
+                ),
+            }
+            for name, (func, index, may_sort) in cases.items():
+                db.session.expire_all()
+                # the last statement; expired objects are refreshed first
+                *_, (statement, parameters) = capture_sql(db, func)
+                plan = query_plan(fp, statement, parameters)
+                start = time.perf_counter()
+                db.session.expire_all()
+                func()
+                elapsed = time.perf_counter() - start
+                ok = any(index in step for step in plan) and (
+                    may_sort or not any("TEMP B-TREE" in step for step in plan)
+                )
+                failed |= not ok
+                print(f"{name:>11}: {elapsed * 1000:8.2f} ms  {'ok' if ok else 'FAIL'}")
+                for step in plan:
+                    print(f"{'':>13}{step}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
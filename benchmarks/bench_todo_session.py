@@ -0,0 +1,87 @@
+"""Count the statements a `CMD_TODO` style session sends, and time each step.
+
+Run with `python -m benchmarks.bench_todo_session`. The steps mirror the
+interactive loop: show, prioritize, finish, add and delete, each followed by
+`commit()` and another show. Only the first show may load the task list; every
+later step must stay within its budget of statements, or the run fails.
+"""
+
+from __future__ import annotations
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typing as tp
+
+import todo_db
+from benchmarks import synthetic
+from todo_db import TodoDB
+
+N_TASKS = 100_000
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = Path(tmp) / "todo.db"
+        synthetic.write_todo_db(fp, N_TASKS)
+        with TodoDB(fp) as db:
+            root = db.session.query(todo_db.Task).filter_by(parent_id=None).first()
+            leaf = (
+                db.session.query(todo_db.Task).order_by(todo_db.Task.id.desc()).first()
+            )
+            added = []
+
+            def show():
+                str(db)
+
+            def prioritize():
+                old = {task.id: task.priority for task in db.get_many([leaf.id])}
+                for task in db.reprioritize_many([leaf.id]):
+                    assert task.priority == old[task.id] + 1
+
+            def finish():
+                for task in db.mark_done_many([leaf.id]):
+                    assert task.done
+
+            def add():
+                added.extend(db.add_tasks(["bench a", "bench b"], parent_id=root.id))
+
+            def delete():
+                assert len(db.delete_many([task.id for task in added])) == len(added)
+
+            # (name, step, statement budget); commits send no statements, and
+            # checking the cached tree costs one `PRAGMA data_version`, while the first
+            # load reads it within its SELECT
+            steps: list[tuple[str, tp.Callable[[], tp.Any], int]] = [
+                ("S", show, 1),
+                ("P", prioritize, 1),
+                ("S", show, 1),
+                ("F", finish, 1),
+                ("S", show, 1),
+                ("S id", lambda: db.show_task(root.id), 1),
+                ("I", lambda: setattr(db[leaf.id], "issue_number", 7), 1),
+                ("A", add, 2),
+                ("S", show, 1),
+                ("D", delete, 1),
+                ("S", show, 1),
+            ]
+            for name, step, budget in steps:
+                before = todo_db.statement_count()
+                start = time.perf_counter()
+                step()
+                db.commit()
+                elapsed = time.perf_counter() - start
+                n = todo_db.statement_count() - before
+                ok = n <= budget
+                failed |= not ok
+                print(
+                    f"{name:>5}: {elapsed * 1000:9.2f} ms  {n} statements"
+                    f" (budget {budget})  {'ok' if ok else 'FAIL'}"
+                )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
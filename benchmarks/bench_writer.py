@@ -0,0 +1,67 @@
+"""Compare write syscalls for a NEWDAY-sized check-in with and without `LogWriter`.
+
+Run with `python -m benchmarks.bench_writer`. Syscall counts come from
+/proc/self/io, so this only runs on Linux.
+"""
+
+from __future__ import annotations
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from log_file import LogWriter
+
+LINES_PER_COMMAND = 15
+COMMANDS = 200
+
+
+def _write_syscalls() -> int:
+    for line in Path("/proc/self/io").read_text().splitlines():
+        if line.startswith("syscw:"):
+            return int(line.split()[1])
+    raise RuntimeError("syscw missing from /proc/self/io")
+
+
+def _open_per_line(path: Path) -> None:
+    for c in range(COMMANDS):
+        for i in range(LINES_PER_COMMAND):
+            with open(path, mode="a") as f:
+                f.write(f"12:00 - command {c} line {i}\n")
+
+
+def _writer(mode: str):
+    def run(path: Path) -> None:
+        with LogWriter(path, mode=mode) as writer:
+            for c in range(COMMANDS):
+                for i in range(LINES_PER_COMMAND):
+                    writer.write(f"12:00 - command {c} line {i}\n")
+                writer.end_command()
+
+    return run
+
+
+def main() -> int:
+    cases = {
+        "open per line": _open_per_line,
+        "LogWriter line": _writer("line"),
+        "LogWriter command": _writer("command"),
+        "LogWriter exit": _writer("exit"),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in cases.items():
+            path = Path(tmp) / f"{name}.md"
+            before = _write_syscalls()
+            start = time.perf_counter()
+            func(path)
+            elapsed = time.perf_counter() - start
+            syscalls = _write_syscalls() - before
+            print(
+                f"{name:>18}: {syscalls:6} write syscalls, {elapsed * 1000:7.2f} ms"
+                f" for {COMMANDS} commands x {LINES_PER_COMMAND} lines"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Benchmark suite over synthetic data, with results written as JSON.
+
+Run with `python -m benchmarks.run [--out results.json] [--compare baseline.json]`.
+Each case reports the best and median of `--repeat` runs. With `--compare`,
+cases that got slower than `--threshold` times the baseline are listed and the
+exit status is 1, so results from two commits can be checked against each other.
+"""
+
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import typing as tp
+
+from benchmarks import synthetic
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _timeit(func: tp.Callable[[], tp.Any], repeat: int) -> dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"best_s": min(times), "median_s": statistics.median(times)}
+
+
+def _quiet(func: tp.Callable[..., tp.Any], *args) -> tp.Callable[[], None]:
+    def run():
+        with redirect_stdout(io.StringIO()):
+            func(*args)
+
+    return run
+
+
+def _git_revision() -> tp.Optional[str]:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=REPO,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() or None
+
+
+def bench_log(tmp: Path, years: float, repeat: int) -> dict[str, dict]:
+    import hourly
+    from hourly_2 import LogREPL
+
+    log = tmp / "vault/logs/hourly_out.md"
+    log.parent.mkdir(parents=True)
+    n_days = synthetic.write_log(log, years)
+    legacy_log = tmp / "hourly_legacy.md"
+    synthetic.write_log(legacy_log, years, separators=True)
+    with open(legacy_log, mode="a") as f:
+        f.write("[ ] benchmark todo # 12:00\n")
+    size = log.stat().st_size
+
+    class REPL(LogREPL):
+        LOG_PATH = log
+        TODO_PATH = tmp / "vault/logs/timelog_todo.db"
+
+    hourly.log_path = str(legacy_log)
+    first_day = f"{synthetic.START:%m/%d/%Y}"
+    results = {
+        "history_last_day": _timeit(_quiet(REPL.CMD_HISTORY), repeat),
+        "history_first_day": _timeit(_quiet(REPL.CMD_HISTORY, first_day), repeat),
+        "get_last_day": _timeit(hourly.get_last_day, repeat),
+        "finish_todo": _timeit(lambda: hourly.finish_todo(0, " - done"), repeat),
+    }
+    for result in results.values():
+        result.update(log_bytes=size, log_days=n_days)
+    return results
+
+
+def bench_todo_db(
+    tmp: Path, n_tasks: int, depth: int, fan_out: int, repeat: int
+) -> dict[str, dict]:
+    from todo_db import TodoDB
+
+    fp = tmp / "todo.db"
+    n_rows = synthetic.write_todo_db(fp, n_tasks, depth, fan_out)
+    with TodoDB(fp) as db:
+
+        def add_and_commit():
+            db.add_task("benchmark task")
+            db.commit()
+
+        results = {
+            "todo_db_str": _timeit(lambda: str(db), repeat),
+            "add_task_commit": _timeit(add_and_commit, repeat),
+        }
+    for result in results.values():
+        result.update(tasks=n_rows, depth=depth, fan_out=fan_out)
+    return results
+
+
+def bench_cold_start(tmp: Path, repeat: int) -> dict[str, dict]:
+    """`hourly_2.py <inp>` in a fresh interpreter, against the synthetic log."""
+    env = {**os.environ, "HOME": str(tmp)}
+    results = {}
+    for name, inp in [("main_once_log", "benchmark entry"), ("main_once_history", "H")]:
+
+        def run():
+            subprocess.run(
+                [sys.executable, str(REPO / "hourly_2.py"), inp],
+                env=env,
+                capture_output=True,
+                check=True,
+            )
+
+        results[f"cold_start_{name}"] = _timeit(run, repeat)
+    return results
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """Names of cases whose best time exceeds `threshold` times the baseline."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        ratio = result["best_s"] / before["best_s"]
+        print(
+            f"{name:>26}: {before['best_s'] * 1000:9.2f} -> "
+            f"{result['best_s'] * 1000:9.2f} ms  x{ratio:.2f}",
+            file=sys.stderr,
+        )
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: tp.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="timelog-bench-"))
+    try:
+        results = {
+            **bench_log(tmp, args.years, args.repeat),
+            **bench_todo_db(tmp, args.tasks, args.depth, args.fan_out, args.repeat),
+            **bench_cold_start(tmp, args.repeat),
+        }
+    finally:
+        shutil.rmtree(tmp)
+    report = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: str(v) for k, v in vars(args).items() if v is not None},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(
+                f"FAIL: slower than x{args.threshold}: {', '.join(regressions)}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Run many writer processes against one log, todo DB and history file at once.
+
+Run with `python -m benchmarks.stress_writers [--procs N] [--entries N]`. Each
+process logs entries through a "line" mode session and as one-shots, starts
+meetings and days, adds tasks and saves history, all at the same time. The run
+fails if any entry is missing or duplicated, a multi-line block was split by
+another process, the day index disagrees with a fresh scan, or a task or
+history entry was lost.
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import multiprocessing
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typing as tp
+
+MEETING_RE = re.compile(r"^--- \d\d/\d\d/\d{4} \(\w+\) (w\d+ m\d+) ---$")
+ENTRY_RE = re.compile(r"^\d\d:\d\d - (w\d+ (?:entry|once) \d+)$")
+DAY_RE = re.compile(r"^---\d\d/\d\d/\d{4} \(\w+\)--- (w\d+ d\d+)$")
+
+
+def worker(tmp: Path, n: int, entries: int, tasks: int) -> None:
+    import readline
+
+    import hourly_2
+    from todo_db import TodoDB
+
+    class REPL(hourly_2.LogREPL):
+        LOG_PATH = tmp / "log.md"
+        TODO_PATH = tmp / "todo.db"
+        HISTORY_PATH = tmp / "history"
+        METRICS_PATH = tmp / "metrics.jsonl"
+        LOG_FLUSH_MODE = "line"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with REPL._writer_context():
+            for i in range(entries):
+                REPL._dispatch(REPL._CMD_DEFAULT, [f"w{n} entry {i}"])
+                if i % 10 == 0:
+                    REPL._dispatch(REPL.CMD_NEWMEETING, [f"w{n} m{i}"])
+                if i % 50 == 0:
+                    day = f"{hourly_2.now():---%m/%d/%Y (%A)---} w{n} d{i}"
+                    REPL._append_text(day)
+        for i in range(entries // 10):
+            REPL.main_once(f"w{n} once {i}")
+
+    with TodoDB(REPL.TODO_PATH) as todo_list:
+        for i in range(tasks):
+            todo_list.add_task(f"w{n} task {i}")
+            todo_list.commit()
+
+    readline.clear_history()
+    readline.read_history_file(str(REPL.HISTORY_PATH))
+    n_read = readline.get_current_history_length()
+    for i in range(20):
+        readline.add_history(f"w{n} history {i}")
+    n_new = readline.get_current_history_length() - n_read
+    hourly_2._merge_history(readline, REPL.HISTORY_PATH, n_new, 10**6)
+
+
+def check_log(path: Path, procs: int, entries: int) -> list[str]:
+    from log_file import DayIndex
+
+    errors = []
+    lines = path.read_text().splitlines()
+    seen: dict[str, int] = {}
+    for i, line in enumerate(lines):
+        match = ENTRY_RE.match(line) or DAY_RE.match(line) or MEETING_RE.match(line)
+        if match is None:
+            # only the body of a meeting block is left
+            continue
+        seen[match.group(1)] = seen.get(match.group(1), 0) + 1
+        if MEETING_RE.match(line) and lines[i + 1 : i + 4] != ["", " ", "<" * 36]:
+            errors.append(f"meeting block split at line {i + 1}")
+    expected = {
+        *(f"w{n} entry {i}" for n in range(procs) for i in range(entries)),
+        *(f"w{n} m{i}" for n in range(procs) for i in range(0, entries, 10)),
+        *(f"w{n} d{i}" for n in range(procs) for i in range(0, entries, 50)),
+        *(f"w{n} once {i}" for n in range(procs) for i in range(entries // 10)),
+    }
+    missing = expected - seen.keys()
+    duplicated = [key for key, count in seen.items() if count > 1]
+    if missing:
+        errors.append(f"{len(missing)} log entries missing, e.g. {min(missing)}")
+    if duplicated:
+        errors.append(f"{len(duplicated)} log entries duplicated")
+    n_lines = len(expected) + 3 * len([k for k in expected if " m" in k])
+    if len(lines) != n_lines:
+        errors.append(f"expected {n_lines} log lines, found {len(lines)}")
+
+    indexed = DayIndex(path).load().days
+    DayIndex(path).index_path.unlink()
+    scanned = DayIndex(path).load().days
+    if scanned != indexed:
+        extra = sorted(set(indexed) ^ set(scanned), key=lambda d: d[1])
+        errors.append(f"day index differs from a fresh scan at {extra[:3]}")
+    return errors
+
+
+def check_todo(path: Path, procs: int, tasks: int) -> list[str]:
+    from todo_db import Task, TodoDB
+
+    with TodoDB(path) as todo_list:
+        descriptions = [t.description for t in todo_list.session.query(Task)]
+    expected = {f"w{n} task {i}" for n in range(procs) for i in range(tasks)}
+    if len(descriptions) != len(expected) or set(descriptions) != expected:
+        return [f"expected {len(expected)} tasks, found {len(descriptions)}"]
+    return []
+
+
+def check_history(path: Path, procs: int) -> list[str]:
+    lines = set(path.read_text().splitlines())
+    missing = [
+        f"w{n} history {i}"
+        for n in range(procs)
+        for i in range(20)
+        if f"w{n} history {i}" not in lines
+    ]
+    return [f"{len(missing)} history entries missing"] if missing else []
+
+
+def main(argv: tp.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=16)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "log.md").touch()
+        (tmp / "history").touch()
+        start = time.perf_counter()
+        # spawned, so no process inherits another's SQLite connections
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=worker, args=(tmp, n, args.entries, args.tasks))
+            for n in range(args.procs)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        errors = [
+            f"worker {n} exited with {p.exitcode}"
+            for n, p in enumerate(processes)
+            if p.exitcode != 0
+        ]
+        errors += check_log(tmp / "log.md", args.procs, args.entries)
+        errors += check_todo(tmp / "todo.db", args.procs, args.tasks)
+        errors += check_history(tmp / "history", args.procs)
+    print(f"{args.procs} processes in {elapsed:.2f} s")
+    for error in errors:
+        print(f"FAIL: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Generators for realistic benchmark data: multi-year logs and large task trees.
+
+Both are deterministic for a given seed, so timings are comparable between runs.
+"""
+
+from __future__ import annotations
+import datetime
+import random
+import sqlite3
+from pathlib import Path
+
+import typing as tp
+
+TAGS = ("review", "deploy", "oncall", "design", "email", "infra")
+MEETINGS = ("standup", "1:1", "planning", "retro", "design review")
+START = datetime.date(2015, 1, 1)
+
+
+def _day_lines(day: datetime.date, rng: random.Random) -> list[str]:
+    """One day as `LogREPL` writes it: check-in, meetings, todos and entries."""
+    lines = [f"{day:---%m/%d/%Y (%A)---} note\n", "in 09:00\n"]
+    lines.append(f"Yesterday, worked on {rng.choice(TAGS)}\n")
+    lines.append(f"Today, more {rng.choice(TAGS)}\n")
+    for meeting in rng.sample(MEETINGS, rng.randint(0, 2)):
+        lines.append(f"--- {day:%m/%d/%Y (%A)} {meeting} ---\n\n \n")
+        lines.append("<" * 36 + "\n")
+    lines += [f"[ ] todo {i} for {day} # 09:{i:02}\n" for i in range(rng.randint(0, 4))]
+    minute = 9 * 60
+    while minute < 18 * 60:
+        minute += rng.randint(10, 90)
+        tag = rng.choice(TAGS)
+        lines.append(f"{minute // 60}:{minute % 60:02} - worked on {tag} #{tag}\n")
+    return lines
+
+
+def write_log(
+    path: Path,
+    years: float = 10,
+    start: datetime.date = START,
+    seed: int = 0,
+    separators: bool = False,
+) -> int:
+    """Write `years` of weekdays to `path`, returning the number of days.
+
+    `hourly.get_last_day` reads back to a `-----` line, so `separators` puts one
+    before every day header for the `hourly.py` benchmarks.
+    """
+    rng = random.Random(seed)
+    day = start
+    end = start + datetime.timedelta(days=round(years * 365.25))
+    n_days = 0
+    with open(path, mode="w") as f:
+        while day < end:
+            if day.weekday() < 5:
+                if separators:
+                    f.write("-----\n")
+                f.writelines(_day_lines(day, rng))
+                n_days += 1
+            day += datetime.timedelta(days=1)
+    return n_days
+
+
+def tree_shape(n_tasks: int, depth: int, fan_out: int) -> list[int]:
+    """Tasks per level so that the whole tree holds about `n_tasks`."""
+    per_root = sum(fan_out**level for level in range(depth))
+    n_roots = max(n_tasks // per_root, 1)
+    return [n_roots * fan_out**level for level in range(depth)]
+
+
+def _tree_rows(
+    n_tasks: int, depth: int, fan_out: int, rng: random.Random
+) -> tp.Iterator[tuple[int, str, tp.Optional[int], bool, int]]:
+    next_id = 1
+    parents: list[tp.Optional[int]] = [None]
+    for level, size in enumerate(tree_shape(n_tasks, depth, fan_out)):
+        ids = range(next_id, next_id + size)
+        for i, task_id in enumerate(ids):
+            parent = parents[i // fan_out] if level else None
+            done = rng.random() < 0.3
+            yield (task_id, f"task {level}.{i}", parent, done, rng.randint(-2, 2))
+        parents = list(ids)
+        next_id += size
+
+
+def write_todo_db(
+    fp: Path, n_tasks: int = 10_000, depth: int = 4, fan_out: int = 4, seed: int = 0
+) -> int:
+    """Create a `TodoDB` file at `fp` with a forest of about `n_tasks` tasks."""
+    import todo_db
+
+    # let TodoDB create the current schema, then fill it without the ORM
+    todo_db.get_engine(fp)
+    todo_db.dispose(fp)
+    rng = random.Random(seed)
+    with sqlite3.connect(fp) as conn:
+        conn.executemany(
+            "INSERT INTO tasks (id, description, parent_id, done, priority)"
+            " VALUES (?, ?, ?, ?, ?)",
+            _tree_rows(n_tasks, depth, fan_out, rng),
+        )
+        (n_rows,) = conn.execute("SELECT count(*) FROM tasks").fetchone()
+    conn.close()
+    return n_rows
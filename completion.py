@@ -0,0 +1,74 @@
+"""Prefix indexes behind `LogREPL`'s readline tab completion.
+
+Keys are kept in one sorted list, so a completion is a bisect plus a walk over
+the matches, and adding or removing a key is a bisect plus one list shift.
+That stays well under a millisecond per keypress with 100k tasks.
+"""
+
+from __future__ import annotations
+from bisect import bisect_left, insort
+
+import typing as tp
+
+# more candidates than this aren't worth listing
+COMPLETION_LIMIT = 50
+
+
+class PrefixIndex:
+    """Sorted `(key, value)` pairs searchable by key prefix."""
+
+    def __init__(self, items: tp.Iterable[tuple[str, tp.Any]] = ()):
+        self._items = sorted(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, key: str, value: tp.Any) -> None:
+        insort(self._items, (key, value))
+
+    def remove(self, key: str, value: tp.Any) -> None:
+        i = bisect_left(self._items, (key, value))
+        if i < len(self._items) and self._items[i] == (key, value):
+            del self._items[i]
+
+    def complete(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[tp.Any]:
+        """Values of the first `limit` keys starting with `prefix`, in key order."""
+        items = self._items
+        i = bisect_left(items, (prefix,))
+        values = []
+        while i < len(items) and len(values) < limit and items[i][0].startswith(prefix):
+            values.append(items[i][1])
+            i += 1
+        return values
+
+
+class TaskIndex:
+    """Open tasks by id and by description prefix, for the todo prompt.
+
+    Description keys are case-folded, so `wri` finds "Write report".
+    """
+
+    def __init__(self, tasks: tp.Iterable[tuple[int, str]] = ()):
+        self.descriptions = dict(tasks)
+        self._ids = PrefixIndex((str(i), i) for i in self.descriptions)
+        self._by_description = PrefixIndex(
+            (d.casefold(), i) for i, d in self.descriptions.items()
+        )
+
+    def add(self, task_id: int, description: str) -> None:
+        self.remove(task_id)
+        self.descriptions[task_id] = description
+        self._ids.add(str(task_id), task_id)
+        self._by_description.add(description.casefold(), task_id)
+
+    def remove(self, task_id: int) -> None:
+        description = self.descriptions.pop(task_id, None)
+        if description is not None:
+            self._ids.remove(str(task_id), task_id)
+            self._by_description.remove(description.casefold(), task_id)
+
+    def complete(self, text: str, limit: int = COMPLETION_LIMIT) -> list[int]:
+        """Ids starting with `text` if it is numeric, else ids by description."""
+        if text.isdigit():
+            return self._ids.complete(text, limit)
+        return self._by_description.complete(text.casefold(), limit)
@@ -1,5 +1,4 @@
 import datetime
-from fileinput import FileInput
 from pathlib import Path
 import os
 import json
@@ -7,6 +6,9 @@ import typing as tp
 from dataclasses import dataclass, field, asdict
 import dataclasses
 
+from log_file import LogWriter, iter_lines_reversed, replace_at
+from task_store import JsonlTaskStore
+
 # utils ------------------------------------------------
 class TaskJSONEncoder(json.JSONEncoder):
     def default(self, o): # pylint: disable=E0202
@@ -38,6 +40,21 @@ def write_todos(task_list):
     with JSON_PATH.open('w+') as f:
         json.dump(task_list, f, cls=TaskJSONEncoder)
 
+# one line per task, appended on change -- see task_store
+JSONL_PATH = JSON_PATH.with_suffix('.jsonl')
+
+def load_task_store():
+    if not JSONL_PATH.exists() and JSON_PATH.exists():
+        # one-time conversion from the whole-file JSON format
+        return JsonlTaskStore.from_tasks(JSONL_PATH, load_todos())
+    return JsonlTaskStore(JSONL_PATH).load()
+
+def finish_task(store, task_id, note=None):
+    record = store[task_id]
+    record.finish(note)
+    store.save(record)
+    return record
+
 def datetime_to_HM(dt):
     return dt.strftime('%H:%M')
         
@@ -82,14 +99,10 @@ class Task:
 log_path = '/home/mccloskey/vault/logs/hourly_out.md'
 TODOS_PATH = Path('/home/mccloskey/Desktop/todos.json')
 accrued_logs = []
+_log_writer = None
 # todos = [Task.from_json_dict(d) for d in json.loads(TODOS_PATH.read_text())]
 # breakpoint()
 
-def replace_line(old, new):
-    with FileInput(files=[log_path], inplace=True) as f:
-        for line in f:
-            print(line if line != old else new, end='')
-
 def leading_0(n):
     if 0 <= n < 10:
         return f'0{n}'
@@ -97,16 +110,25 @@ def leading_0(n):
         return str(n)
 
 def write_log(log):
-    with open(log_path, mode='a+') as f:
-        f.write(f'{log}\n')
+    if _log_writer is None:
+        with open(log_path, mode='a+') as f:
+            f.write(f'{log}\n')
+    else:
+        _log_writer.write(f'{log}\n')
+
+def get_last_day_with_offsets():
+    # read backwards so only today's lines are touched, keeping the line above the separator
+    lines = []
+    found_separator = False
+    for offset, line in iter_lines_reversed(log_path):
+        lines.append((offset, line.decode()))
+        if found_separator:
+            break
+        found_separator = line.startswith(b'-----')
+    return lines[::-1]
 
 def get_last_day():
-    with open(log_path, mode='r') as f:
-        lines = f.readlines()
-    for i in range(len(lines)-1,0,-1):
-        if lines[i].startswith('-----'):
-            break
-    return lines[i-1:]
+    return [line for _, line in get_last_day_with_offsets()]
 
 def print_last_day():
     print(''.join(get_last_day()))
@@ -136,9 +158,11 @@ def get_meetings():
             return meetings
         meetings.append(desc)
 
-def get_todos():
+def get_todos_with_offsets():
+    return [(o, l) for o, l in get_last_day_with_offsets() if l.startswith(('['))]
 
-    return [l for l in get_last_day() if l.startswith(('['))]
+def get_todos():
+    return [l for _, l in get_todos_with_offsets()]
 
 def write_todo(todo):
     now = datetime.datetime.now()
@@ -152,9 +176,10 @@ def write_todos(todo_str, echo=False):
         print(log)
 
 def finish_todo(enum, note):
-    finished_str = get_todos()[int(enum)]
-    replace = finished_str.replace('[ ]', f'[{datetime.datetime.now().strftime("%H:%M")}]')
-    replace_line(finished_str, f'{replace.strip()}{note}\n')
+    # patch the todo by offset: only today's tail is rewritten and duplicate lines are left alone
+    offset, finished_str = get_todos_with_offsets()[int(enum)]
+    replace = finished_str.replace('[ ]', f'[{datetime.datetime.now().strftime("%H:%M")}]', 1)
+    replace_at(log_path, offset, finished_str.encode(), f'{replace.strip()}{note}\n'.encode())
 
 def todo_loop():
     while True:
@@ -247,9 +272,13 @@ def parse_and_handle_input():
 
 
 def main():
-    cont = True
-    while cont:
-        cont = parse_and_handle_input()
+    global _log_writer
+    # todos are read back and patched right after being written, so write through per line
+    with LogWriter(log_path, mode='line') as _log_writer:
+        cont = True
+        while cont:
+            cont = parse_and_handle_input()
+    _log_writer = None
 
 if __name__ == "__main__":
     main()
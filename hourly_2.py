@@ -7,17 +7,38 @@ import re
 
 import typing as tp
 import datetime
-import readline
 
-from todo_db import TodoDB
-import todo_config
+# todo_db (SQLAlchemy), todo_config and readline are imported where they are used
+# so that one-shot `hourly_2.py <text>` logging starts fast
+from log_file import DAY_HEADER_RE, LOG_IO, DayIndex, LogWriter
+from log_file import append_locked, locked, parse_date, parse_date_range
+
+if tp.TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from completion import PrefixIndex, TaskIndex
+    from log_search import SearchIndex
+    from todo_db import TodoDB
 
 now = datetime.datetime.now
 
+TODO_PROMPT = "[P]rioritize, [F]inish, [A]dd, [S]how, [C]lear, [O]pen, [I]ssue? "
+
 
 def open_files(paths: tp.Iterable[Path]) -> None:
+    """Open `paths` in their default applications, without waiting for them."""
+    import subprocess
+
     for p in paths:
-        os.system(f"xdg-open {p.resolve()}")
+        try:
+            subprocess.Popen(
+                ["xdg-open", str(p.resolve())],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            print(f"Couldn't open {p}: {e}")
 
 
 def _get_rotated_filename(path: Path, i: int) -> Path:
@@ -42,6 +63,196 @@ def rotate_file(path: Path, *, max_backups: int = 10) -> None:
     path.touch()
 
 
+def _split_ids(id_: tp.Optional[int], desc: str) -> tuple[list[int], str]:
+    """Split the `;2;3 rest` tail of `F1;2;3 rest` into `[1, 2, 3]` and `" rest"`."""
+    more, rest = re.match(r"((?:\s*;\s*\d+)*)(.*)", desc).groups()
+    ids = [] if id_ is None else [id_]
+    ids += [int(i) for i in more.split(";") if i.strip()]
+    return ids, rest
+
+
+def _tree_options(text: str) -> dict[str, tp.Any]:
+    """Parse `open depth=2 collapse=50` into `Task.iter_tree` options."""
+    options: dict[str, tp.Any] = {}
+    for word in text.split():
+        name, _, value = word.partition("=")
+        if name == "open" and not value:
+            options["hide_done"] = True
+        elif name in ("depth", "collapse") and value.isdigit():
+            options["max_depth" if name == "depth" else "collapse"] = int(value)
+        else:
+            raise ValueError(f"Unknown option {word!r}")
+    return options
+
+
+def _page(lines: tp.Iterable[str], page_size: tp.Optional[int] = None) -> None:
+    """Print `lines` as they come, pausing after each screenful on a terminal."""
+    if page_size is None:
+        if not (sys.stdin.isatty() and sys.stdout.isatty()):
+            sys.stdout.writelines(lines)
+            return
+        page_size = max(os.get_terminal_size().lines - 1, 1)
+    for i, line in enumerate(lines, start=1):
+        sys.stdout.write(line)
+        if i % page_size == 0 and input("-- more (q to stop) -- ").lower() == "q":
+            return
+
+
+def _merge_history(readline, path: Path, n_new: int, max_lines: int) -> None:
+    """Append this session's last `n_new` history entries to `path`.
+
+    Other sessions may have added to the file since it was read, so their
+    entries are kept; the file is then trimmed to its last `max_lines` lines.
+    """
+    with open(path, mode="r+") as f, locked(f):
+        if n_new > 0:
+            readline.append_history_file(n_new, str(path))
+        lines = f.readlines()
+        if len(lines) > max_lines:
+            f.seek(0)
+            f.writelines(lines[-max_lines:])
+            f.truncate()
+
+
+@contextmanager
+def _completion(
+    complete: tp.Callable[[str], list[str]],
+    delims: str,
+    show: tp.Optional[tp.Callable[[str, list[str], int], None]] = None,
+) -> tp.Iterator[None]:
+    """Tab-complete with `complete(text)` in this block, then restore the old completer.
+
+    `show`, if given, lists the candidates when there are several.
+    """
+    import readline
+
+    old_completer, old_delims = (
+        readline.get_completer(),
+        readline.get_completer_delims(),
+    )
+    matches: list[str] = []
+
+    def completer(text: str, state: int) -> tp.Optional[str]:
+        nonlocal matches
+        if state == 0:
+            matches = complete(text)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(completer)
+    readline.set_completer_delims(delims)
+    readline.set_completion_display_matches_hook(show)
+    readline.parse_and_bind("tab: complete")
+    try:
+        yield
+    finally:
+        readline.set_completer(old_completer)
+        readline.set_completer_delims(old_delims)
+        readline.set_completion_display_matches_hook(None)
+
+
+class _TaskCompleter:
+    """Completes the id in `F12` or `Fwrite rep`, or after a `;` in `F1;2`.
+
+    A description prefix that matches one task becomes its id; several matches
+    extend the text as far as their descriptions agree, like a shell would.
+    """
+
+    def __init__(self, task_index: TaskIndex):
+        self.task_index = task_index
+        # id of each candidate last offered, for `show`
+        self.ids: dict[str, int] = {}
+
+    def complete(self, text: str) -> list[str]:
+        import readline
+
+        from completion import COMPLETION_LIMIT
+
+        if readline.get_begidx() > 0:
+            prefix, word = "", text.lstrip()
+        else:
+            match = re.match(r"([PFSDIOA])(.*)", text, re.IGNORECASE)
+            if match is None:
+                return []
+            prefix, word = match.groups()
+        ids = self.task_index.complete(word)
+        if word.isdigit() or len(ids) == 1:
+            self.ids = {f"{prefix}{i}": i for i in ids}
+        else:
+            descriptions = self.task_index.descriptions
+            # keep what was typed, whatever its case
+            self.ids = {f"{text}{descriptions[i][len(word):]}": i for i in ids}
+        candidates = list(self.ids)
+        if len(ids) == COMPLETION_LIMIT:
+            # there are more; keep readline from extending the text to what these share
+            candidates.append(text)
+        return candidates
+
+    def show(self, substitution: str, matches: list[str], longest: int) -> None:
+        import readline
+
+        print()
+        for match in matches:
+            if match in self.ids:
+                task_id = self.ids[match]
+                print(f"{task_id:>8} {self.task_index.descriptions[task_id]}")
+        print(TODO_PROMPT + readline.get_line_buffer(), end="", flush=True)
+
+
+@contextmanager
+def _task_completion(todo_list: TodoDB) -> tp.Iterator[TaskIndex]:
+    """Complete open task ids at the todo prompt; keep the yielded index current."""
+    from completion import TaskIndex
+
+    completer = _TaskCompleter(TaskIndex(todo_list.open_descriptions()))
+    with _completion(completer.complete, ";", completer.show):
+        yield completer.task_index
+
+
+def _parse_report_args(
+    args: str,
+) -> tuple[str, tp.Optional[tuple[datetime.date, datetime.date]]]:
+    """REPORT's `[grouping] [MM/DD/YYYY[..MM/DD/YYYY]]`, grouping by week by default."""
+    from log_report import GROUPINGS
+
+    words = args.split()
+    by = words.pop(0).lower() if words and words[0].lower() in GROUPINGS else "week"
+    if len(words) > 1:
+        raise ValueError(f"Unexpected {' '.join(words[1:])!r}")
+    return by, parse_date_range(words[0]) if words else None
+
+
+def local(func):
+    """Mark a command that needs the caller's terminal or desktop.
+
+    Local commands always run in the calling process, never in the daemon.
+    """
+    func.LOCAL = True
+    return func
+
+
+def parses(parse: tp.Callable[[str], tp.Any]):
+    """Only run the command if `parse` accepts its argument.
+
+    When `parse` raises ValueError, the whole input is logged as text instead,
+    so an entry like `h went to lunch` isn't lost to the `H` command.
+    """
+
+    def decorator(func):
+        func.PARSE_ARGS = parse
+        return func
+
+    return decorator
+
+
+def exact(func):
+    """Match the command only as typed in capitals, or by a symbol alias.
+
+    Its arguments are free text, so `search for keys` is a log entry, not a search.
+    """
+    func.EXACT = True
+    return func
+
+
 def alias(*aliases: str):
     def decorator(func):
         func.ALIASES = tuple(aliases)
@@ -56,13 +267,154 @@ class LogREPL:
     LOG_PATH = _BASE_DIR / "hourly_out.md"
     TODO_PATH = _BASE_DIR / "timelog_todo.db"
     HISTORY_PATH = _BASE_DIR / "timelog.history"
+    HISTORY_LENGTH = 1000
+    SOCKET_PATH = _BASE_DIR / "timelog.sock"
+    # one JSON line per command, summarized by STATS
+    METRICS_PATH = _BASE_DIR / "timelog.metrics.jsonl"
+    # profile every command into PROFILE_DIR; also set by `--profile`
+    PROFILE_COMMANDS = bool(os.environ.get("TIMELOG_PROFILE"))
+    PROFILE_DIR = _BASE_DIR / "profiles"
+    # one of LogWriter.MODES: "line", "command" or "exit"
+    LOG_FLUSH_MODE = "command"
+    # opt-in: archive closed months on startup once the log is bigger than this;
+    # None leaves it to an explicit ROTATE_LOG
+    LOG_ROTATE_MAX_BYTES: tp.Optional[int] = None
+    LOG_ROTATE_KEEP_MONTHS = 1
+    # REPORT parses ranges larger than this in a process pool
+    REPORT_PARALLEL_BYTES = 64 * 2**20
+    # also fsync the log after each command, off the prompt thread
+    LOG_SYNC_EACH_COMMAND = False
+
+    _writer: tp.Optional[LogWriter] = None
+    # opened by the first SEARCH of a session, then kept current after each command
+    _search_index: tp.Optional[SearchIndex] = None
+    # runs side effects off the prompt thread during `main_loop`; without it
+    # (one-shots, the daemon) they run inline
+    _executor: tp.Optional[ThreadPoolExecutor] = None
+    _background_jobs: list[tuple[str, Future]] = []
+    # started by `_launch`; nothing waits for these
+    _launches: list[tuple[str, Future]] = []
+    # command names and aliases, for tab completion at the `log:` prompt
+    _command_index: tp.Optional[PrefixIndex] = None
 
     # HELPERS ##################################################################
 
     @classmethod
     def _append_text(cls, text: str) -> None:
-        with open(cls.LOG_PATH, mode="a") as f:
-            f.write(f"{text}\n")
+        if cls._writer is None:
+            LOG_IO.written += append_locked(cls.LOG_PATH, f"{text}\n".encode())
+        else:
+            cls._writer.write(f"{text}\n")
+        if any(DAY_HEADER_RE.match(line.encode()) for line in text.splitlines()):
+            cls._flush_log()
+            cls._in_background("day index", DayIndex(cls.LOG_PATH).load)
+
+    @classmethod
+    def _flush_log(cls) -> None:
+        if cls._writer is not None:
+            cls._writer.flush()
+
+    @classmethod
+    def _end_command(cls) -> None:
+        if cls._writer is not None:
+            cls._writer.end_command()
+            if cls.LOG_SYNC_EACH_COMMAND:
+                cls._in_background("log sync", cls._writer.sync)
+        if cls._search_index is not None:
+            cls._flush_log()
+            cls._in_background("search index", cls._search_index.update)
+
+    @classmethod
+    def _in_background(cls, name: str, func: tp.Callable, *args) -> None:
+        """Queue `func(*args)` on the background thread, or run it now if there is none.
+
+        Jobs run one at a time, in order; their errors are printed at the next prompt.
+        """
+        if cls._executor is None:
+            func(*args)
+        else:
+            cls._background_jobs.append((name, cls._executor.submit(func, *args)))
+
+    @classmethod
+    def _launch(cls, name: str, func: tp.Callable, *args) -> None:
+        """Run `func(*args)` on a thread of its own, or now if there is no session.
+
+        For hooks that may block until a program they start exits, which must hold
+        up neither the background jobs nor quitting. Errors are printed like theirs.
+        """
+        import threading
+        from concurrent.futures import Future
+
+        if cls._executor is None:
+            func(*args)
+            return
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"timelog {name}", daemon=True).start()
+        cls._launches.append((name, future))
+
+    @classmethod
+    def _report_background(cls, wait: bool = False) -> None:
+        """Print the errors of finished jobs; with `wait`, finish every job first.
+
+        Launches are never waited for.
+        """
+        pending = []
+        for name, future in cls._background_jobs:
+            if not (wait or future.done()):
+                pending.append((name, future))
+            elif (error := future.exception()) is not None:
+                print(f"Background {name} failed: {type(error).__name__}: {error}")
+        cls._background_jobs = pending
+        running = []
+        for name, future in cls._launches:
+            if not future.done():
+                running.append((name, future))
+            elif (error := future.exception()) is not None:
+                print(f"Background {name} failed: {type(error).__name__}: {error}")
+        cls._launches = running
+
+    @classmethod
+    @contextmanager
+    def _background_context(cls):
+        from concurrent.futures import ThreadPoolExecutor
+
+        cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timelog")
+        try:
+            yield cls._executor
+        finally:
+            # nothing queued is dropped on exit
+            cls._report_background(wait=True)
+            cls._executor.shutdown()
+            cls._executor = None
+
+    @classmethod
+    @contextmanager
+    def _writer_context(cls):
+        if cls._writer is not None:
+            # already owned by an enclosing session, e.g. the daemon
+            try:
+                yield cls._writer
+            finally:
+                cls._writer.end_command()
+            return
+        cls._writer = LogWriter(cls.LOG_PATH, mode=cls.LOG_FLUSH_MODE)
+        try:
+            yield cls._writer
+        finally:
+            cls._writer.close()
+            cls._writer = None
+
+    @classmethod
+    def _day_index(cls) -> DayIndex:
+        cls._flush_log()
+        return DayIndex(cls.LOG_PATH).load()
 
     @classmethod
     def _write_log(cls, text: str) -> None:
@@ -70,31 +422,65 @@ class LogREPL:
         print(msg)
         cls._append_text(msg)
 
+    @classmethod
+    def _dispatch(cls, cmd: tp.Callable[..., bool], args: list[str]) -> bool:
+        """Run `cmd` and flush what it wrote, recording its latency."""
+        import log_metrics
+
+        name = cmd.__name__[4:] if cmd.__name__.startswith("CMD_") else "LOG"
+        profile_dir = cls.PROFILE_DIR if cls.PROFILE_COMMANDS else None
+        with log_metrics.measure(cls.METRICS_PATH, name, profile_dir):
+            cont = cmd(*args)
+            cls._end_command()
+        return cont
+
     @classmethod
     def _get_cmds(cls) -> tp.Iterable[tp.Callable[..., bool]]:
         attrs = (getattr(cls, name) for name in dir(cls) if name.startswith("CMD_"))
         return filter(callable, attrs)
 
+    @classmethod
+    def _complete_command(cls, text: str) -> list[str]:
+        import readline
+
+        if readline.get_begidx() > 0:
+            # only the first word is a command
+            return []
+        if cls._command_index is None:
+            from completion import PrefixIndex
+
+            cls._command_index = PrefixIndex(
+                (name, name)
+                for func in cls._get_cmds()
+                for name in [func.__name__[4:], *getattr(func, "ALIASES", ())]
+            )
+        return cls._command_index.complete(text.upper())
+
     # COMMANDS #################################################################
 
     @classmethod
+    @local
     @alias("T")
     def CMD_TODO(cls, *args: str, show_list_first: bool = True) -> bool:
-        """Manage the todo list."""
+        """Manage the todo list. `S[id] open depth=N collapse=N` filters the tree."""
+        from todo_db import TodoDB
+
         todo_path = cls.TODO_PATH
         if args and args[0].isdigit():
             todo_path = _get_rotated_filename(cls.TODO_PATH, int(args[0]))
-        with TodoDB(todo_path) as todo_list:
+        with TodoDB(todo_path) as todo_list, _task_completion(todo_list) as task_index:
             for a in args:
-                todo_list.add_task(a)
+                task = todo_list.add_task(a)
+                task_index.add(task.id, task.description)
+            # don't hold the write lock while the list is shown
+            todo_list.commit()
 
             if show_list_first:
-                print(todo_list)
+                _page(todo_list.iter_task())
 
             while True:
-                inp = input(
-                    "[P]rioritize, [F]inish, [A]dd, [S]how, [C]lear, [O]pen, [I]ssue? "
-                )
+                cls._report_background()
+                inp = input(TODO_PROMPT)
                 if not inp:
                     return True
                 # see if command is one of the defaults -- letter + optional number
@@ -102,68 +488,151 @@ class LogREPL:
                 cmd = cmd.upper()
                 id_ = int(id_) if id_ else None
                 if cmd == "P":
-                    task = todo_list[id_]
-                    old = task.priority
-                    if desc.strip().isnumeric():
-                        new = int(desc.strip())
-                        todo_list[id_].priority = new
-                    else:
-                        task.priority += 1
-                    cls._write_log(
-                        f"Priotized {task.description} from {old} to {task.priority}"
-                    )
+                    ids, rest = _split_ids(id_, desc)
+                    old = {task.id: task.priority for task in todo_list.get_many(ids)}
+                    new = int(rest.strip()) if rest.strip().isnumeric() else None
+                    for task in todo_list.reprioritize_many(ids, new):
+                        cls._write_log(
+                            f"Priotized {task.description} from {old[task.id]} to {task.priority}"
+                        )
                 elif cmd == "F":
-                    task = todo_list.mark_done(id_)
-                    cls._write_log(f"Finished {task.description}")
+                    ids, _ = _split_ids(id_, desc)
+                    for task in todo_list.mark_done_many(ids):
+                        task_index.remove(task.id)
+                        cls._write_log(f"Finished {task.description}")
                 elif cmd == "A":
-                    for subd in desc.split(";"):
-                        task = todo_list.add_task(subd, parent_id=id_)
+                    for task in todo_list.add_tasks(desc.split(";"), parent_id=id_):
+                        task_index.add(task.id, task.description)
                     cls._write_log(f"Added {desc}")
                 elif cmd == "S":
-                    print(todo_list.show_task(id_))
+                    try:
+                        options = _tree_options(desc)
+                    except ValueError as e:
+                        print(f"{e}; expected any of: open depth=N collapse=N")
+                        continue
+                    _page(todo_list.iter_task(id_, **options))
                 elif cmd in ["C", "CLEAR"]:
                     cls.CMD_CLEAR()
                 elif cmd in ["O"]:
-                    todo_config.open_task(id_ and todo_list[id_].issue_number)
+                    import todo_config
+
+                    issue_number = id_ and todo_list[id_].issue_number
+                    cls._launch("open task", todo_config.open_task, issue_number)
                 elif cmd == "I":
-                    task = todo_list[id_]
                     if not desc.strip().isnumeric():
                         print(f"Invalid issue number: {desc}")
                         continue
-                    task.issue_number = int(desc.strip())
+                    try:
+                        task = todo_list.set_issue_number(id_, int(desc.strip()))
+                    except ValueError as e:
+                        print(e)
+                        continue
                     cls._write_log(
                         f"Added issue number {task.issue_number} to {task.description}"
                     )
                 elif cmd == "D":
-                    tasks = []
-                    if id_:
-                        tasks.append(todo_list[id_])
-                    if desc.strip():
-                        tasks.extend(todo_list[int(i.strip())] for i in desc.split(";"))
-                    for task in tasks:
-                        check = input(f"Delete {task.id} {task.description}? (y/n) ")
+                    ids, rest = _split_ids(id_, desc)
+                    ids += [int(i) for i in re.split(r"[;\s]+", rest) if i]
+                    confirmed = []
+                    for task in todo_list.get_many(ids):
+                        check = input(
+                            f"Delete {task.id} {task.description} and its subtasks? (y/n) "
+                        )
                         if check.lower() == "y":
-                            todo_list.delete_task(task.id)
-                            cls._write_log(f"Deleted {task.description}")
+                            confirmed.append(task)
+                    for task_id in todo_list.delete_many(
+                        [task.id for task in confirmed]
+                    ):
+                        task_index.remove(task_id)
+                    for task in confirmed:
+                        cls._write_log(f"Deleted {task.description}")
 
                 else:
                     task = todo_list.add_task(inp)
+                    task_index.add(task.id, task.description)
                     cls._write_log(f"Added {task.description}")
                 todo_list.commit()
+                cls._end_command()
+
+    @classmethod
+    @alias("TS")
+    @exact
+    def CMD_TODO_SEARCH(cls, words: str = "") -> bool:
+        """Find tasks in the todo DB and its rotated backups (generation, id)."""
+        from todo_db import TodoArchive
+
+        paths = {i: _get_rotated_filename(cls.TODO_PATH, i) for i in range(1, 11)}
+        with TodoArchive({0: cls.TODO_PATH, **paths}) as archive:
+            tasks = archive.search(words)
+        print("gen    id")
+        for task in tasks:
+            print(task)
+        return True
+
+    @classmethod
+    def CMD_IMPORT_TODOS(cls, paths: str = "") -> bool:
+        """Import legacy todos from logs or JSON files (default: the log and its archives)."""
+        import todo_import
+
+        if paths:
+            sources = [Path(p).expanduser() for p in paths.split()]
+        else:
+            cls._flush_log()
+            log = cls.LOG_PATH
+            archives = log.parent.glob(f"{log.stem}.*{log.suffix}.gz")
+            sources = [*sorted(archives), log]
+        missing = [p for p in sources if not p.exists()]
+        if missing:
+            print(f"No such file: {', '.join(map(str, missing))}")
+            return True
+        n_rows = todo_import.import_files(cls.TODO_PATH, sources)
+        print(f"Imported {n_rows} todos from {len(sources)} files")
+        return True
 
     @classmethod
     def CMD_ROTATE_TODO(cls) -> bool:
         """Rotate the todo file."""
+        import todo_db
+
+        todo_db.dispose(cls.TODO_PATH, reset=True)
         rotate_file(cls.TODO_PATH)
         return True
 
     @classmethod
+    def CMD_ROTATE_LOG(cls) -> bool:
+        """Move closed months of the log into compressed yearly archives."""
+        import log_archive
+        import log_report
+
+        cls._flush_log()
+        # queued index updates must not read the log while it is rewritten
+        cls._report_background(wait=True)
+        cutoff = log_archive.closed_months_cutoff(
+            now().date(), cls.LOG_ROTATE_KEEP_MONTHS
+        )
+        index = cls._day_index()
+        n_days = log_archive.days_to_archive(index.days, cutoff)
+        log_report.SummaryCache(cls.LOG_PATH).archive(index, n_days)
+        n_days = log_archive.rotate_log(cls.LOG_PATH, cutoff)
+        print(f"Archived {n_days} days before {cutoff:%m/%d/%Y}")
+        return True
+
+    @classmethod
+    @local
     def CMD_WHATADO(cls) -> bool:
         """Help! I don't know what to do!"""
+        from todo_db import Task, TodoDB
+
         with TodoDB(cls.TODO_PATH) as todo_list:
-            print(todo_list)
+            roots = todo_list.open_roots()
+            for task, n_open in roots:
+                print(f"[ ] {task.id} {task.description} ({n_open} open subtasks)")
             print("Try breaking up the task into smaller tasks.")
-            print(todo_list[0].format_tree())
+            if roots:
+                top, _ = roots[0]
+                # linked in one query, so rendering doesn't load subtasks one by one
+                subtree = todo_list.load_subtree(top.id)
+                Task.write_tree(*subtree, out=sys.stdout, hide_done=True)
 
         cls.CMD_TODO(show_list_first=False)
         return True
@@ -174,44 +643,124 @@ class LogREPL:
         return False
 
     @classmethod
-    def CMD_NEWMEETING(cls, description: str) -> bool:
-        """Start a new meeting."""
-        text = f"""--- {now():%m/%d/%Y (%A)} {description} ---
+    def _meeting_text(cls, description: str) -> str:
+        return f"""--- {now():%m/%d/%Y (%A)} {description} ---
 
  
 <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<"""
-        cls._append_text(text)
+
+    @classmethod
+    def CMD_NEWMEETING(cls, description: str) -> bool:
+        """Start a new meeting."""
+        cls._append_text(cls._meeting_text(description))
         return True
 
     @classmethod
     @alias("H")
-    def CMD_HISTORY(cls) -> bool:
-        print(cls.LOG_PATH.read_text())
+    @parses(parse_date_range)
+    def CMD_HISTORY(cls, *args: str) -> bool:
+        """Show the last day, or the days in MM/DD/YYYY[..MM/DD/YYYY]."""
+        index = cls._day_index()
+        if not args:
+            print(index.read(index.last_day_offset()))
+            return True
+        first, last = parse_date_range(args[0])
+        text = ""
+        if not index.days or first < index.days[0][0]:
+            from log_archive import LogArchive
+
+            text = LogArchive(cls.LOG_PATH).read(first, last)
+        span = index.span(first, last)
+        if span is not None:
+            text += index.read(*span)
+        print(text or f"No days logged in {args[0]}")
         return True
 
     @classmethod
+    @parses(_parse_report_args)
+    def CMD_REPORT(cls, args: str = "") -> bool:
+        """Time spent: REPORT [day|week|month|tag|task] [MM/DD/YYYY[..MM/DD/YYYY]]."""
+        import log_report
+
+        by, dates = _parse_report_args(args)
+        index = cls._day_index()
+        if by != "task":
+            # archived days keep the offsets they had in the live log, so match dates
+            summaries = log_report.SummaryCache(cls.LOG_PATH).summaries(index)
+            if dates is not None:
+                first, last = dates
+                summaries = [s for s in summaries if first <= parse_date(s.day) <= last]
+                if not summaries:
+                    print(f"No days logged in {args.split()[-1]}")
+                    return True
+            print(log_report.report_from_summaries(summaries, by).format())
+            return True
+        from log_archive import LogArchive
+
+        # rotated days come from the archives, the rest from the live log
+        archived = LogArchive(cls.LOG_PATH).iter_days(*(dates or ()))
+        report = log_report.report_from_days((data for _, data in archived), by)
+        span = index.span(*dates) if dates is not None else (0, None)
+        if span is None and not report.keys:
+            print(f"No days logged in {args.split()[-1]}")
+            return True
+        if span is not None:
+            start, end = span
+            size = (end if end is not None else cls.LOG_PATH.stat().st_size) - start
+            jobs = (os.cpu_count() or 1) if size > cls.REPORT_PARALLEL_BYTES else 1
+            offsets = [offset for _, offset in index.days]
+            ranges = log_report.split_days(offsets, start, end, jobs)
+            report.merge(log_report.build_report(cls.LOG_PATH, by, ranges, jobs=jobs))
+        print(report.format())
+        return True
+
+    @classmethod
+    @alias("/")
+    @exact
+    def CMD_SEARCH(cls, query: str = "") -> bool:
+        """Search the log, best matches first: `/ <words>` or `SEARCH <words>`."""
+        if not query.strip():
+            print("Usage: / <words>")
+            return True
+        if cls._search_index is None:
+            from log_search import SearchIndex
+
+            cls._search_index = SearchIndex(cls.LOG_PATH)
+        cls._flush_log()
+        cls._report_background(wait=True)
+        cls._search_index.update()
+        for day, time, text in cls._search_index.search(query):
+            print(f"{day} {time:>5} {text}")
+        return True
+
+    @classmethod
+    @local
     @alias("O")
     def CMD_OPEN(cls):
         """Open the log file in the default text editor."""
+        cls._flush_log()
         open_files([cls.LOG_PATH])
         return True
 
     @classmethod
+    @local
     def CMD_NEWDAY(cls) -> bool:
         """Start a new day."""
         # show previous day
         cls.CMD_HISTORY()
-        # start new day
+        # start new day; the block is appended at once, so other sessions'
+        # entries can't land inside it
         note = input("Note? ")
-        cls._append_text(f"{now():---%m/%d/%Y (%A)---} {note}\nin {now():%H:%M}")
+        block = [f"{now():---%m/%d/%Y (%A)---} {note}\nin {now():%H:%M}"]
 
         # prompt for summary of yesterday and today
         for prompt in ["Yesterday, ", "Today, "]:
-            cls._append_text(prompt + input(prompt))
+            block.append(prompt + input(prompt))
 
         # prompt for meetings
         while description := input("Next meeting: "):
-            cls.CMD_NEWMEETING(description)
+            block.append(cls._meeting_text(description))
+        cls._append_text("\n".join(block))
 
         # finish checkin
         cls._write_log("finished checkin")
@@ -224,12 +773,29 @@ class LogREPL:
         return True
 
     @classmethod
+    @local
     def CMD_CLEAR(cls) -> bool:
         """Clear the screen."""
         _, lines = os.get_terminal_size()
         print("\n" * lines)
         return True
 
+    @classmethod
+    @exact
+    def CMD_STATS(cls, commands: str = "") -> bool:
+        """Latency percentiles per command, optionally only for the given commands."""
+        import log_metrics
+
+        names = {c.upper() for c in commands.split()} or None
+        stats = log_metrics.summarize(cls.METRICS_PATH, names)
+        if not stats:
+            print(f"No metrics recorded in {cls.METRICS_PATH}")
+            return True
+        print(log_metrics.STATS_HEADER)
+        for row in stats:
+            print(row)
+        return True
+
     @classmethod
     def CMD_HELP(cls) -> bool:
         print("Commands: ")
@@ -246,8 +812,8 @@ class LogREPL:
         if not inp:
             return cls.CMD_QUIT, []
 
-        cmd, *args = inp.split(" ", maxsplit=1)
-        cmd = cmd.upper()
+        name, *args = inp.split(" ", maxsplit=1)
+        cmd = name.upper()
         for func in cls._get_cmds():
             func_cmd = func.__name__[4:]
             if cmd in [func_cmd, *getattr(func, "ALIASES", [])]:
@@ -255,9 +821,16 @@ class LogREPL:
         else:
             func = None
 
-        NO_ARG_FUNCS = [cls.CMD_QUIT, cls.CMD_HISTORY, cls.CMD_OPEN]
+        NO_ARG_FUNCS = [cls.CMD_QUIT, cls.CMD_OPEN]
         if func in NO_ARG_FUNCS and args:
             func = None
+        elif getattr(func, "EXACT", False) and name != cmd:
+            func = None
+        elif func is not None and args and hasattr(func, "PARSE_ARGS"):
+            try:
+                func.PARSE_ARGS(args[0])
+            except ValueError:
+                func = None
 
         if not func:
             return cls._CMD_DEFAULT, [inp]
@@ -266,22 +839,34 @@ class LogREPL:
     @classmethod
     @contextmanager
     def _state_context(cls):
+        import readline
+
         # setup
         print("Welcome to log! Config files:")
         for expected_path in [cls.LOG_PATH, cls.TODO_PATH, cls.HISTORY_PATH]:
             if not expected_path.exists():
                 expected_path.touch()
             print(expected_path)
+        max_bytes = cls.LOG_ROTATE_MAX_BYTES
+        if max_bytes is not None and cls.LOG_PATH.stat().st_size > max_bytes:
+            cls.CMD_ROTATE_LOG()
 
         readline.read_history_file(str(cls.HISTORY_PATH))
         readline.set_auto_history(True)
-        readline.set_history_length(1000)
+        readline.set_history_length(cls.HISTORY_LENGTH)
+        n_read = readline.get_current_history_length()
         try:
-            yield
+            # the background jobs finish before the writer closes
+            with cls._writer_context(), cls._background_context(), _completion(
+                cls._complete_command, " \t\n"
+            ):
+                yield
         except (KeyboardInterrupt, EOFError):
             print("Goodbye!")
         finally:
-            readline.write_history_file(str(cls.HISTORY_PATH))
+            # merge, rather than overwrite what other sessions saved meanwhile
+            n_new = readline.get_current_history_length() - n_read
+            _merge_history(readline, cls.HISTORY_PATH, n_new, cls.HISTORY_LENGTH)
 
     @classmethod
     def main_loop(cls):
@@ -289,21 +874,65 @@ class LogREPL:
             # main loop
             cont = True
             while cont:
+                cls._report_background()
                 inp = input("log: ")
                 cmd, args = cls._get_cmd_and_args(inp)
-                cont = cmd(*args)
+                cont = cls._dispatch(cmd, args)
                 if cont is None:
                     raise ValueError(f"Command {cmd} returned None")
 
     @classmethod
     def main_once(cls, inp):
         cmd, args = cls._get_cmd_and_args(inp)
-        cmd(*args)
+        with cls._writer_context():
+            cls._dispatch(cmd, args)
+
+    @classmethod
+    def _is_local(cls, inp: str) -> bool:
+        cmd, _ = cls._get_cmd_and_args(inp)
+        return getattr(cmd, "LOCAL", False)
+
+    @classmethod
+    def _handle_remote(cls, inp: str) -> None:
+        if cls._is_local(inp):
+            print(f"{inp!r} must be run locally")
+        else:
+            cls.main_once(inp)
+
+    @classmethod
+    def main_daemon(cls):
+        import log_daemon
+        import todo_db
+
+        # pay for SQLAlchemy, the engine and the schema check once, up front
+        todo_db.dispose(cls.TODO_PATH)
+        with cls._writer_context():
+            log_daemon.serve(cls.SOCKET_PATH, cls._handle_remote)
+
+    @classmethod
+    def main_client(cls, inp: str):
+        if not cls._is_local(inp):
+            import log_daemon
+
+            reply = log_daemon.send(cls.SOCKET_PATH, inp)
+            if reply is not None:
+                print(reply, end="")
+                return
+        cls.main_once(inp)
 
     @classmethod
     def main(cls):
-        if len(sys.argv) > 1:
-            cls.main_once(" ".join(sys.argv[1:]))
+        args = sys.argv[1:]
+        if args[:1] == ["--profile"]:
+            cls.PROFILE_COMMANDS = True
+            args = args[1:]
+        if args == ["--daemon"]:
+            cls.main_daemon()
+        elif args and cls.PROFILE_COMMANDS:
+            # profile here rather than in the daemon
+            cls.main_once(" ".join(args))
+        elif args:
+            cls.main_client(" ".join(args))
         else:
             cls.main_loop()
 
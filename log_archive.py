@@ -0,0 +1,143 @@
+"""Compressed yearly archives of closed days from the markdown log.
+
+Each archive (`hourly_out.2025.md.gz` next to `hourly_out.md`) is a series of
+gzip members, one per day, so `zcat` still shows the whole year. A sidecar
+`<archive>.days` records `<offset> <length> <MM/DD/YYYY>` for every member, so
+reading one past day seeks to its member and decompresses only that.
+"""
+
+from __future__ import annotations
+import datetime
+import gzip
+import os
+from pathlib import Path
+
+import typing as tp
+
+from log_file import DayIndex, locked, parse_date
+
+
+class LogArchive:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def archive_path(self, year: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{year}{self.path.suffix}.gz")
+
+    def _index_path(self, year: int) -> Path:
+        archive = self.archive_path(year)
+        return archive.with_name(f"{archive.name}.days")
+
+    def days(self, year: int) -> list[tuple[datetime.date, int, int]]:
+        """`(day, member offset, member length)` for every day archived in `year`."""
+        index_path = self._index_path(year)
+        if not index_path.exists():
+            return []
+        days = []
+        for line in index_path.read_text().splitlines():
+            offset, length, day = line.split(" ", maxsplit=2)
+            days.append((parse_date(day), int(offset), int(length)))
+        return days
+
+    def add(self, days: tp.Iterable[tuple[datetime.date, bytes]]) -> int:
+        """Append each day as its own gzip member, fsyncing before returning."""
+        by_year: dict[int, list[tuple[datetime.date, bytes]]] = {}
+        for day, data in days:
+            by_year.setdefault(day.year, []).append((day, data))
+        for year, year_days in by_year.items():
+            with open(self.archive_path(year), mode="ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                entries = []
+                for day, data in year_days:
+                    member = gzip.compress(data, mtime=0)
+                    f.write(member)
+                    entries.append(f"{offset} {len(member)} {day:%m/%d/%Y}\n")
+                    offset += len(member)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_path(year), mode="a") as f:
+                f.writelines(entries)
+        return sum(len(year_days) for year_days in by_year.values())
+
+    def years(self) -> list[int]:
+        """Years that have an archive, oldest first."""
+        head, tail = f"{self.path.stem}.", f"{self.path.suffix}.gz"
+        years = []
+        for archive in self.path.parent.glob(f"{head}*{tail}"):
+            year = archive.name[len(head) : -len(tail)]
+            if year.isdigit():
+                years.append(int(year))
+        return sorted(years)
+
+    def iter_days(
+        self,
+        first: tp.Optional[datetime.date] = None,
+        last: tp.Optional[datetime.date] = None,
+    ) -> tp.Iterator[tuple[datetime.date, bytes]]:
+        """`(day, text)` of the archived days `first..last`, or of all of them."""
+        for year in self.years():
+            if first is not None and not first.year <= year <= (last or first).year:
+                continue
+            members = [
+                (day, o, n)
+                for day, o, n in self.days(year)
+                if first is None or first <= day <= (last or first)
+            ]
+            if not members:
+                continue
+            with open(self.archive_path(year), mode="rb") as f:
+                for day, offset, length in members:
+                    f.seek(offset)
+                    yield day, gzip.decompress(f.read(length))
+
+    def read(
+        self, first: datetime.date, last: tp.Optional[datetime.date] = None
+    ) -> str:
+        """The archived days `first..last`, decompressing only their members."""
+        return "".join(data.decode() for _, data in self.iter_days(first, last))
+
+
+def closed_months_cutoff(today: datetime.date, keep_months: int = 1) -> datetime.date:
+    """First day of the oldest month to keep in the live log."""
+    month_index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def days_to_archive(
+    days: tp.Sequence[tuple[datetime.date, int]], cutoff: datetime.date
+) -> int:
+    """How many leading `days` of a `DayIndex` `rotate_log` moves out.
+
+    Those are the days before the first one on or after `cutoff`, but never the
+    last day: it may still be open, e.g. yesterday's on the 1st of the month.
+    """
+    n = next((i for i, (day, _) in enumerate(days) if day >= cutoff), len(days))
+    return max(min(n, len(days) - 1), 0)
+
+
+def rotate_log(path: Path, cutoff: datetime.date) -> int:
+    """Move the days `days_to_archive` picks from `path` into yearly archives.
+
+    Text before the first day header stays at the top of the log. The log is
+    rewritten in place after the archives are synced, so append handles held by
+    other sessions keep pointing at it. Returns the number of days archived.
+    """
+    index = DayIndex(path).load()
+    n_days = days_to_archive(index.days, cutoff)
+    if not n_days:
+        return 0
+    preamble_end = index.days[0][1]
+    keep_from = index.days[n_days][1]
+    with open(path, mode="r+b") as f, locked(f):
+        data = f.read()
+        bounds = [o for _, o in index.days[1:]] + [len(data)]
+        closed = [
+            (day, data[start:end])
+            for (day, start), end in zip(index.days[:n_days], bounds)
+        ]
+        LogArchive(path).add(closed)
+        f.seek(0)
+        f.write(data[:preamble_end] + data[keep_from:])
+        f.truncate()
+    DayIndex(path).load()
+    return len(closed)
@@ -0,0 +1,82 @@
+"""Optional long-lived server that runs `LogREPL` commands sent over a Unix socket.
+
+Start it with `hourly_2.py --daemon`. One-shot `hourly_2.py <text>` calls forward
+their command to it and print the reply, falling back to running in-process when
+no daemon is listening. Anything that can write to a Unix socket is a client, so
+a hotkey can skip Python entirely:
+
+    printf 'did a thing' | nc -NU ~/vault/logs/timelog.sock
+"""
+
+from __future__ import annotations
+from contextlib import redirect_stdout
+import io
+import signal
+import socket
+from pathlib import Path
+
+import typing as tp
+
+
+def _connect(socket_path: Path, timeout: float) -> tp.Optional[socket.socket]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(socket_path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def send(socket_path: Path, inp: str, timeout: float = 5.0) -> tp.Optional[str]:
+    """Run `inp` in the daemon and return its output, or None if none is listening."""
+    sock = _connect(socket_path, timeout)
+    if sock is None:
+        return None
+    # `timeout` only bounds connecting; a REPORT over years may take longer
+    sock.settimeout(None)
+    with sock:
+        sock.sendall(inp.encode())
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(1 << 16):
+            chunks.append(chunk)
+    return b"".join(chunks).decode()
+
+
+def serve(socket_path: Path, handle_command: tp.Callable[[str], None]) -> None:
+    """Handle one command per connection, in order, until interrupted."""
+    # imported here so that clients only pay for `socket`
+    import socketserver
+    import traceback
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            inp = self.rfile.read().decode().strip()
+            if not inp:
+                return
+            out = io.StringIO()
+            with redirect_stdout(out):
+                try:
+                    handle_command(inp)
+                except Exception:  # pylint: disable=broad-except
+                    traceback.print_exc(file=out)
+            self.wfile.write(out.getvalue().encode())
+
+    probe = _connect(socket_path, timeout=1.0)
+    if probe is not None:
+        probe.close()
+        raise RuntimeError(f"A daemon is already listening on {socket_path}")
+    socket_path.unlink(missing_ok=True)
+    # stop the same way on `kill` as on Ctrl-C, so the log writer is flushed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # not threaded: commands share the REPL's writer and stdout redirection
+    with socketserver.UnixStreamServer(str(socket_path), Handler) as server:
+        print(f"Listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Goodbye!")
+        finally:
+            socket_path.unlink(missing_ok=True)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+from contextlib import AbstractContextManager, contextmanager
+import datetime
+import fcntl
+import os
+import re
+import threading
+from pathlib import Path
+
+import typing as tp
+
+# matches the `---MM/DD/YYYY (Day)---` header written by `LogREPL.CMD_NEWDAY`
+DAY_HEADER_RE = re.compile(rb"^---(\d{2}/\d{2}/\d{4}) \(\w+\)---")
+
+
+class IOCounts:
+    """Running totals of log bytes read and written, reported by `log_metrics`."""
+
+    __slots__ = ("read", "written")
+
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+
+
+# every helper that touches a log adds to this
+LOG_IO = IOCounts()
+
+
+def parse_day_header(line: bytes) -> tp.Optional[datetime.date]:
+    match = DAY_HEADER_RE.match(line)
+    if not match:
+        return None
+    return parse_date(match.group(1).decode())
+
+
+def parse_date(text: str) -> datetime.date:
+    """Parse MM/DD/YYYY; much cheaper than `strptime` when loading many days."""
+    month, day, year = text.strip().split("/")
+    if len(year) != 4:
+        raise ValueError(f"Expected MM/DD/YYYY, got {text!r}")
+    return datetime.date(int(year), int(month), int(day))
+
+
+def parse_date_range(text: str) -> tuple[datetime.date, datetime.date]:
+    """Parse MM/DD/YYYY[..MM/DD/YYYY]; a single date is a one-day range."""
+    first, _, last = text.partition("..")
+    first = parse_date(first)
+    return first, parse_date(last) if last else first
+
+
+@contextmanager
+def locked(f: tp.IO) -> tp.Iterator[tp.IO]:
+    """Hold an exclusive advisory lock on the open file `f` for the block.
+
+    Every writer of a log takes this lock, so appends from several sessions
+    never interleave with each other or with an in-place rewrite.
+    """
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        # buffered writes must land before another writer gets in
+        f.flush()
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def append_locked(path: tp.Union[str, Path], data: bytes) -> int:
+    """Append `data` to `path` in one write under its lock."""
+    with open(path, mode="ab", buffering=0) as f, locked(f):
+        return f.write(data)
+
+
+def iter_lines_reversed(
+    path: tp.Union[str, Path], block_size: int = 1 << 16
+) -> tp.Iterator[tuple[int, bytes]]:
+    """Yield `(offset, line)` pairs from the end of `path` towards the start.
+
+    The file is read in `block_size` blocks from the end, so a caller that stops
+    early only pays for the bytes it looked at.
+    """
+    with open(path, mode="rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            buf = f.read(read_size) + tail
+            LOG_IO.read += read_size
+            if pos == 0:
+                cut = 0
+            else:
+                # the text before the first newline may continue in the previous block
+                cut = buf.find(b"\n") + 1
+                if cut == 0:
+                    tail = buf
+                    continue
+            tail = buf[:cut]
+            *lines, last = buf[cut:].split(b"\n")
+            lines = [line + b"\n" for line in lines]
+            if last:
+                lines.append(last)
+            offset = pos + len(buf)
+            for line in reversed(lines):
+                offset -= len(line)
+                yield offset, line
+
+
+def replace_at(path: tp.Union[str, Path], offset: int, old: bytes, new: bytes) -> None:
+    """Replace the bytes `old` found at `offset` with `new`, in place.
+
+    Only the bytes from `offset` to EOF are rewritten, so patching a line near
+    the end of a large log is cheap even when the width changes.
+    """
+    with open(path, mode="r+b") as f, locked(f):
+        f.seek(offset)
+        rest = f.read()
+        LOG_IO.read += len(rest)
+        if not rest.startswith(old):
+            raise ValueError(f"{old!r} not found at offset {offset} in {path}")
+        f.seek(offset)
+        LOG_IO.written += f.write(new + rest[len(old) :])
+        f.truncate()
+
+
+def _inode(path: tp.Union[str, Path]) -> tp.Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+class LogWriter(AbstractContextManager):
+    """One append handle for a session, batching writes under a durability mode.
+
+    - "line": write through after every line
+    - "command": buffer until `end_command()`, typically once per REPL command
+    - "exit": buffer until `close()`, then fsync
+    """
+
+    MODES = ("line", "command", "exit")
+
+    def __init__(self, path: tp.Union[str, Path], mode: str = "command"):
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Unknown flush mode {mode!r}, expected one of {self.MODES}"
+            )
+        self.path = path
+        self.mode = mode
+        # opened on first flush, so commands that never write don't touch the log
+        self._file: tp.Optional[tp.BinaryIO] = None
+        self._pending: list[bytes] = []
+        # `sync` may run on `LogREPL`'s background thread while `flush` reopens
+        self._lock = threading.RLock()
+
+    def write(self, text: str) -> None:
+        self._pending.append(text.encode())
+        if self.mode == "line":
+            self.flush()
+
+    def end_command(self) -> None:
+        if self.mode != "exit":
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._lock:
+            if self._file is not None and os.fstat(
+                self._file.fileno()
+            ).st_ino != _inode(self.path):
+                # replaced under us, e.g. saved by an editor; follow the new file
+                self._file.close()
+                self._file = None
+            if self._file is None:
+                self._file = open(self.path, mode="ab", buffering=0)
+            with locked(self._file):
+                LOG_IO.written += self._file.write(b"".join(self._pending))
+            self._pending.clear()
+
+    def sync(self) -> None:
+        """fsync what has been flushed so far."""
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._file is None:
+                return
+            if self.mode == "exit":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class DayIndex:
+    """Byte offsets of every day header in a log, persisted in a sidecar file.
+
+    The sidecar holds one `<offset> <MM/DD/YYYY>` line per header. On load the
+    last indexed header is checked in place and only the bytes after it are
+    scanned, so keeping the index current costs O(size of the last day).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = path.with_name(f"{path.name}.days")
+        self.days: list[tuple[datetime.date, int]] = []
+
+    def load(self) -> DayIndex:
+        self.days = self._read_sidecar()
+        if self.days and not self._is_header_at(*self.days[-1]):
+            # the log was edited or truncated under us
+            self.days = []
+            self.index_path.unlink(missing_ok=True)
+        start = self.days[-1][1] if self.days else 0
+        new_days = [d for d in self._scan(start) if d[1] > start or not self.days]
+        if new_days:
+            with open(self.index_path, mode="a") as f, locked(f):
+                # another session may have indexed some of these days since we read
+                self.days = self._read_sidecar()
+                last = self.days[-1][1] if self.days else -1
+                new_days = [d for d in new_days if d[1] > last]
+                f.writelines(f"{offset} {day:%m/%d/%Y}\n" for day, offset in new_days)
+            self.days.extend(new_days)
+        return self
+
+    def _read_sidecar(self) -> list[tuple[datetime.date, int]]:
+        if not self.index_path.exists():
+            return []
+        days = []
+        for line in self.index_path.read_text().splitlines():
+            offset, day = line.split(" ", maxsplit=1)
+            days.append((parse_date(day), int(offset)))
+        return days
+
+    def _is_header_at(self, day: datetime.date, offset: int) -> bool:
+        if not self.path.exists():
+            return False
+        with open(self.path, mode="rb") as f:
+            f.seek(offset)
+            line = f.readline()
+            LOG_IO.read += len(line)
+            return parse_day_header(line) == day
+
+    def _scan(self, start: int) -> tp.Iterator[tuple[datetime.date, int]]:
+        if not self.path.exists():
+            return
+        with open(self.path, mode="rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                day = parse_day_header(line)
+                if day is not None:
+                    yield day, offset
+                offset += len(line)
+            LOG_IO.read += offset - start
+
+    def span(
+        self, first: datetime.date, last: tp.Optional[datetime.date] = None
+    ) -> tp.Optional[tuple[int, tp.Optional[int]]]:
+        """Byte range covering the days `first..last`, end None meaning EOF."""
+        last = last or first
+        start = end = None
+        for day, offset in self.days:
+            if start is None and first <= day <= last:
+                start = offset
+            elif start is not None and day > last:
+                end = offset
+                break
+        return None if start is None else (start, end)
+
+    def last_day_offset(self) -> int:
+        return self.days[-1][1] if self.days else 0
+
+    def read(self, start: int, end: tp.Optional[int] = None) -> str:
+        with open(self.path, mode="rb") as f:
+            f.seek(start)
+            data = f.read() if end is None else f.read(end - start)
+        LOG_IO.read += len(data)
+        return data.decode()
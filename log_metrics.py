@@ -0,0 +1,125 @@
+"""Per-command latency records for `LogREPL`, and opt-in profiling.
+
+Every dispatched command appends one JSON line to the metrics file:
+
+    {"t": 1760000000.0, "cmd": "TODO", "ms": 12.3, "sql": 4, "rd": 2048, "wr": 61}
+
+`sql` counts statements sent through `todo_db` engines, and `rd`/`wr` count log
+bytes moved by the helpers in `log_file`, `log_report` and `log_search`. Commands
+that prompt (TODO, NEWDAY) include the time spent waiting for input.
+"""
+
+from __future__ import annotations
+from contextlib import contextmanager
+import sys
+import time
+from pathlib import Path
+
+import typing as tp
+
+from log_file import LOG_IO
+
+
+def _statement_count() -> int:
+    # only ask todo_db if a command already imported it, to keep one-shots light
+    todo_db = sys.modules.get("todo_db")
+    return todo_db.statement_count() if todo_db is not None else 0
+
+
+@contextmanager
+def measure(
+    metrics_path: Path, name: str, profile_dir: tp.Optional[Path] = None
+) -> tp.Iterator[None]:
+    """Record the command run in this block; with `profile_dir`, also profile it."""
+    profiler = None
+    if profile_dir is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    sql, read, written = _statement_count(), LOG_IO.read, LOG_IO.written
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        # formatted by hand so one-shot commands don't import json; `name` is
+        # a command name, which never needs escaping
+        record = (
+            f'{{"t":{time.time():.3f},"cmd":"{name}","ms":{elapsed * 1000:.3f},'
+            f'"sql":{_statement_count() - sql},"rd":{LOG_IO.read - read},'
+            f'"wr":{LOG_IO.written - written}}}\n'
+        )
+        with open(metrics_path, mode="a") as f:
+            f.write(record)
+        if profiler is not None:
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            out = profile_dir / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+            profiler.dump_stats(out)
+            print(f"Profile written to {out} (view with `python -m pstats {out}`)")
+
+
+def _percentile(sorted_values: tp.Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    i = max(round(q * len(sorted_values)) - 1, 0)
+    return sorted_values[min(i, len(sorted_values) - 1)]
+
+
+class CommandStats(tp.NamedTuple):
+    cmd: str
+    n: int
+    p50_ms: float
+    p95_ms: float
+    mean_sql: float
+    mean_read: float
+    mean_written: float
+
+    def __str__(self):
+        return (
+            f"{self.cmd:>14} {self.n:6} {self.p50_ms:9.1f} {self.p95_ms:9.1f}"
+            f" {self.mean_sql:7.1f} {self.mean_read / 1024:9.1f} {self.mean_written:9.0f}"
+        )
+
+
+STATS_HEADER = (
+    f"{'command':>14} {'n':>6} {'p50 ms':>9} {'p95 ms':>9}"
+    f" {'sql':>7} {'read KiB':>9} {'written B':>9}"
+)
+
+
+def summarize(
+    metrics_path: Path, commands: tp.Optional[tp.Collection[str]] = None
+) -> list[CommandStats]:
+    """Latency percentiles and mean costs per command, slowest p95 first."""
+    import json
+
+    if not metrics_path.exists():
+        return []
+    records: dict[str, list[dict]] = {}
+    with open(metrics_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a line cut short by a crash
+                continue
+            if commands is None or record["cmd"] in commands:
+                records.setdefault(record["cmd"], []).append(record)
+    stats = []
+    for cmd, rs in records.items():
+        times = sorted(r["ms"] for r in rs)
+        stats.append(
+            CommandStats(
+                cmd,
+                len(rs),
+                _percentile(times, 0.5),
+                _percentile(times, 0.95),
+                sum(r["sql"] for r in rs) / len(rs),
+                sum(r["rd"] for r in rs) / len(rs),
+                sum(r["wr"] for r in rs) / len(rs),
+            )
+        )
+    return sorted(stats, key=lambda s: -s.p95_ms)
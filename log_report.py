@@ -0,0 +1,346 @@
+"""Time accounting over the `HH:MM - text` log format.
+
+Parsing is a generator pipeline, so memory stays constant in the size of the log:
+
+    read_lines -> parse_entries -> intervals -> aggregate
+
+An interval runs from one entry (or the `in HH:MM` check-in) to the next entry of
+the same day and is attributed to the later entry, since a log line records what
+was done since the previous one.
+"""
+
+from __future__ import annotations
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import datetime
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import typing as tp
+
+from log_file import LOG_IO, DayIndex, parse_date, parse_day_header
+
+ENTRY_RE = re.compile(rb"^(\d{1,2}):(\d{2}) - (.*)")
+CHECKIN_RE = re.compile(rb"^in (\d{1,2}):(\d{2})")
+TAG_RE = re.compile(r"#(\w+)")
+# the block header written by `LogREPL.CMD_NEWMEETING`
+MEETING_RE = re.compile(rb"^--- \d{2}/\d{2}/\d{4} \(\w+\) .* ---")
+CHECKBOX_RE = re.compile(rb"^\[( |\d{1,2}:\d{2})\]")
+
+GROUPINGS = ("day", "week", "month", "tag", "task")
+
+
+class Entry(tp.NamedTuple):
+    day: datetime.date
+    minute: int
+    text: tp.Optional[str]
+
+
+class Interval(tp.NamedTuple):
+    day: datetime.date
+    start: int
+    end: int
+    text: str
+
+    @property
+    def minutes(self) -> int:
+        return self.end - self.start
+
+
+def read_lines(
+    path: Path, start: int = 0, end: tp.Optional[int] = None
+) -> tp.Iterator[bytes]:
+    with open(path, mode="rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        for line in f:
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                remaining -= len(line)
+            LOG_IO.read += len(line)
+            yield line
+
+
+def parse_entries(lines: tp.Iterable[bytes]) -> tp.Iterator[Entry]:
+    """Timestamped entries; `text` is None for the `in HH:MM` check-in."""
+    day = None
+    for line in lines:
+        header_day = parse_day_header(line)
+        if header_day is not None:
+            day = header_day
+            continue
+        if day is None:
+            continue
+        if match := ENTRY_RE.match(line):
+            hour, minute, text = match.groups()
+            yield Entry(day, int(hour) * 60 + int(minute), text.decode().strip())
+        elif match := CHECKIN_RE.match(line):
+            hour, minute = match.groups()
+            yield Entry(day, int(hour) * 60 + int(minute), None)
+
+
+def intervals(entries: tp.Iterable[Entry]) -> tp.Iterator[Interval]:
+    previous = None
+    for entry in entries:
+        if (
+            previous is not None
+            and previous.day == entry.day
+            and entry.text is not None
+            and entry.minute >= previous.minute
+        ):
+            yield Interval(entry.day, previous.minute, entry.minute, entry.text)
+        previous = entry
+
+
+def _keys(interval: Interval, by: str) -> tp.Iterable[str]:
+    if by == "day":
+        return (f"{interval.day:%Y-%m-%d}",)
+    if by == "week":
+        monday = interval.day - datetime.timedelta(days=interval.day.weekday())
+        return (f"week of {monday:%Y-%m-%d}",)
+    if by == "month":
+        return (f"{interval.day:%Y-%m}",)
+    if by == "tag":
+        return [f"#{tag}" for tag in TAG_RE.findall(interval.text)] or ["(untagged)"]
+    if by == "task":
+        return (interval.text,)
+    raise ValueError(f"Unknown grouping {by!r}, expected one of {GROUPINGS}")
+
+
+class Report:
+    """Minutes and interval counts per key, stored as array columns."""
+
+    def __init__(self, by: str):
+        self.by = by
+        self.keys: list[str] = []
+        self._ids: dict[str, int] = {}
+        self.minutes = array("q")
+        self.counts = array("q")
+
+    def add(self, key: str, minutes: int, count: int = 1) -> None:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.minutes.append(0)
+            self.counts.append(0)
+        self.minutes[i] += minutes
+        self.counts[i] += count
+
+    def merge(self, other: Report) -> None:
+        for key, minutes, count in zip(other.keys, other.minutes, other.counts):
+            self.add(key, minutes, count)
+
+    def rows(self) -> list[tuple[str, int, int]]:
+        rows = list(zip(self.keys, self.minutes, self.counts))
+        if self.by in ("tag", "task"):
+            return sorted(rows, key=lambda row: -row[1])
+        return sorted(rows)
+
+    def format(self) -> str:
+        lines = [
+            f"{minutes // 60:4}h{minutes % 60:02}  {count:5} entries  {key}"
+            for key, minutes, count in self.rows()
+        ]
+        total = sum(self.minutes)
+        lines.append(f"{total // 60:4}h{total % 60:02}  total")
+        return "\n".join(lines)
+
+
+def aggregate(spans: tp.Iterable[Interval], by: str) -> Report:
+    report = Report(by)
+    for interval in spans:
+        for key in _keys(interval, by):
+            report.add(key, interval.minutes)
+    return report
+
+
+def _report_range(path: Path, start: int, end: tp.Optional[int], by: str) -> Report:
+    return aggregate(intervals(parse_entries(read_lines(path, start, end))), by)
+
+
+def build_report(
+    path: Path,
+    by: str,
+    ranges: tp.Sequence[tuple[int, tp.Optional[int]]],
+    jobs: int = 1,
+) -> Report:
+    """Aggregate the byte `ranges` of `path`, which must start on day headers.
+
+    With `jobs > 1` each range is parsed in a separate process; the caller is
+    expected to split on day boundaries so no interval spans two ranges.
+    """
+    report = Report(by)
+    if jobs <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            report.merge(_report_range(path, start, end, by))
+        return report
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(_report_range, path, start, end, by) for start, end in ranges
+        ]
+        for future in futures:
+            report.merge(future.result())
+    return report
+
+
+def report_from_days(days: tp.Iterable[bytes], by: str) -> Report:
+    """Same as `build_report` over the text of whole days, e.g. from `LogArchive`."""
+    lines = (line for data in days for line in data.splitlines(keepends=True))
+    return aggregate(intervals(parse_entries(lines)), by)
+
+
+def split_days(
+    day_offsets: tp.Sequence[int], start: int, end: tp.Optional[int], n: int
+) -> list[tuple[int, tp.Optional[int]]]:
+    """Split `start..end` into about `n` ranges that begin on day headers."""
+    offsets = [o for o in day_offsets if start < o and (end is None or o < end)]
+    step = max(len(offsets) // n, 1)
+    cuts = [start, *offsets[step::step][: n - 1]]
+    return list(zip(cuts, [*cuts[1:], end]))
+
+
+@dataclass
+class DaySummary:
+    """Aggregates for one day of the log, cached by byte range and content hash."""
+
+    day: str
+    start: int
+    end: int
+    digest: str
+    entries: int = 0
+    first: tp.Optional[str] = None
+    last: tp.Optional[str] = None
+    todos_added: int = 0
+    todos_finished: int = 0
+    meetings: int = 0
+    minutes: int = 0
+    intervals: int = 0
+    # tag -> [minutes, intervals]
+    tags: dict[str, list[int]] = field(default_factory=dict)
+    # moved out of the live log by `log_archive.rotate_log`
+    archived: bool = False
+
+    @classmethod
+    def from_bytes(cls, day: str, start: int, data: bytes) -> DaySummary:
+        summary = cls(day, start, start + len(data), hashlib.blake2b(data).hexdigest())
+        lines = data.splitlines()
+        for line in lines:
+            if MEETING_RE.match(line):
+                summary.meetings += 1
+            elif match := CHECKBOX_RE.match(line):
+                summary.todos_added += 1
+                summary.todos_finished += match.group(1) != b" "
+            elif match := ENTRY_RE.match(line):
+                text = match.group(3)
+                if text.startswith(b"Added "):
+                    summary.todos_added += text.count(b";") + 1
+                elif text.startswith(b"Finished "):
+                    summary.todos_finished += 1
+        for entry in parse_entries(lines):
+            summary.entries += entry.text is not None
+            hhmm = f"{entry.minute // 60:02}:{entry.minute % 60:02}"
+            summary.first = summary.first or hhmm
+            summary.last = hhmm
+        for interval in intervals(parse_entries(lines)):
+            summary.minutes += interval.minutes
+            summary.intervals += 1
+            for tag in _keys(interval, "tag"):
+                minutes, count = summary.tags.get(tag, (0, 0))
+                summary.tags[tag] = [minutes + interval.minutes, count + 1]
+        return summary
+
+
+class SummaryCache:
+    """Per-day summaries persisted next to the log.
+
+    A cached day is reused without reading the log when its header date and byte
+    range are unchanged. Days whose offsets moved are hashed and reused when the
+    content still matches, so only new days, the current (open) day and days
+    edited in the editor are parsed again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.cache_path = path.with_name(f"{path.name}.summary.json")
+
+    def _load(self) -> tuple[dict[str, int], list[DaySummary]]:
+        """The `{"inode", "size"}` of the log when last saved, and the summaries."""
+        if not self.cache_path.exists():
+            return {}, []
+        try:
+            data = json.loads(self.cache_path.read_text())
+            return data["log"], [DaySummary(**d) for d in data["days"]]
+        except (ValueError, TypeError, KeyError):
+            return {}, []
+
+    def summaries(self, index: DayIndex) -> list[DaySummary]:
+        log, cached = self._load()
+        archived = [s for s in cached if s.archived]
+        cached = [s for s in cached if not s.archived]
+        stat = self.path.stat()
+        size = stat.st_size
+        # appends keep the inode and only grow the log; an editor saving it
+        # replaces the file, and may have changed a day without moving it
+        grown = log.get("inode") == stat.st_ino and log.get("size", size + 1) <= size
+        by_range = {(s.day, s.start, s.end): s for s in cached} if grown else {}
+        by_digest = {(s.day, s.digest): s for s in cached}
+        bounds = [offset for _, offset in index.days[1:]] + [size]
+        summaries = []
+        changed = len(cached) != len(index.days)
+        with open(self.path, mode="rb") as f:
+            for i, ((day, start), end) in enumerate(zip(index.days, bounds)):
+                key = f"{day:%m/%d/%Y}"
+                is_open = i == len(index.days) - 1
+                summary = None if is_open else by_range.get((key, start, end))
+                if summary is None:
+                    f.seek(start)
+                    data = f.read(end - start)
+                    LOG_IO.read += len(data)
+                    digest = hashlib.blake2b(data).hexdigest()
+                    summary = by_digest.get((key, digest))
+                    if summary is None:
+                        summary = DaySummary.from_bytes(key, start, data)
+                        changed = True
+                    elif (summary.start, summary.end) != (start, end):
+                        summary.start, summary.end = start, end
+                        changed = True
+                summaries.append(summary)
+        summaries = archived + summaries
+        if changed or not grown or log["size"] != size:
+            self._save(summaries)
+        return summaries
+
+    def _save(self, summaries: list[DaySummary]) -> None:
+        stat = self.path.stat()
+        log = {"inode": stat.st_ino, "size": stat.st_size}
+        days = [vars(s) for s in summaries]
+        self.cache_path.write_text(json.dumps({"log": log, "days": days}))
+
+    def archive(self, index: DayIndex, n_days: int) -> None:
+        """Keep the summaries of the first `n_days` days once they leave the live log."""
+        summaries = self.summaries(index)
+        live = summaries[len(summaries) - len(index.days) :]
+        for summary in live[:n_days]:
+            summary.archived = True
+        self._save(summaries)
+
+
+def report_from_summaries(summaries: tp.Iterable[DaySummary], by: str) -> Report:
+    """Same as `build_report` for every grouping but "task", without parsing."""
+    if by == "task":
+        raise ValueError("Day summaries don't keep per-task totals")
+    report = Report(by)
+    for summary in summaries:
+        if by == "tag":
+            for tag, (minutes, count) in summary.tags.items():
+                report.add(tag, minutes, count)
+            continue
+        (key,) = _keys(Interval(parse_date(summary.day), 0, 0, ""), by)
+        if summary.intervals:
+            report.add(key, summary.minutes, summary.intervals)
+    return report
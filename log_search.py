@@ -0,0 +1,125 @@
+from __future__ import annotations
+import hashlib
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+import typing as tp
+
+from log_file import LOG_IO, parse_day_header
+
+ENTRY_RE = re.compile(r"^(\d{1,2}:\d{2}) - (.*)")
+# bytes before the indexed size that must be unchanged for an incremental update
+_FINGERPRINT_BYTES = 256
+
+
+def _add_rows(rows: list[tuple[str, str, str]], data: bytes, day: str) -> str:
+    """Append a `(text, day, time)` row per line of `data`; return the last day."""
+    for line in data.splitlines():
+        header_day = parse_day_header(line)
+        if header_day is not None:
+            day = f"{header_day:%m/%d/%Y}"
+        text = line.decode().strip()
+        if not text:
+            continue
+        match = ENTRY_RE.match(text)
+        rows.append((match.group(2), day, match.group(1)) if match else (text, day, ""))
+    return day
+
+
+class SearchIndex:
+    """SQLite FTS5 index of log lines, keyed by day and time.
+
+    The index remembers the log's inode, how many bytes of it it has seen and a
+    fingerprint of the bytes just before that point. `update()` only reads what
+    was appended since, and rebuilds from scratch when the log was replaced (as
+    editors save), shrank, or was edited before the indexed point.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db_path = path.with_name(f"{path.name}.search.db")
+        # `LogREPL` updates it from its background thread, one job at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries
+                USING fts5(text, day UNINDEXED, time UNINDEXED);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _get_meta(self) -> dict[str, str]:
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def _fingerprint(self, f: tp.BinaryIO, size: int) -> str:
+        start = max(size - _FINGERPRINT_BYTES, 0)
+        f.seek(start)
+        return hashlib.blake2b(f.read(size - start)).hexdigest()
+
+    def update(self) -> int:
+        """Index what was appended since the last update, returning the new entry count.
+
+        Rebuilding also indexes the days `log_archive.rotate_log` moved out of
+        the log, which is how the index notices a rotation in the first place.
+        """
+        if not self.path.exists():
+            return 0
+        meta = self._get_meta()
+        indexed = int(meta.get("size", 0))
+        day = meta.get("day", "")
+        rows: list[tuple[str, str, str]] = []
+        with open(self.path, mode="rb") as f:
+            size = f.seek(0, 2)
+            inode = str(os.fstat(f.fileno()).st_ino)
+            # an editor saving the log replaces the file, and may have changed
+            # lines well before the fingerprinted bytes without moving them
+            if (
+                size < indexed
+                or (indexed and inode != meta.get("inode"))
+                or (
+                    indexed and self._fingerprint(f, indexed) != meta.get("fingerprint")
+                )
+            ):
+                indexed, day = 0, ""
+                self.conn.execute("DELETE FROM entries")
+            if not indexed:
+                from log_archive import LogArchive
+
+                for _, archived in LogArchive(self.path).iter_days():
+                    _add_rows(rows, archived, "")
+            f.seek(indexed)
+            data = f.read(size - indexed)
+            LOG_IO.read += len(data)
+            # leave a partially written last line for next time
+            data = data[: data.rfind(b"\n") + 1]
+            day = _add_rows(rows, data, day)
+            indexed += len(data)
+            fingerprint = self._fingerprint(f, indexed)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO entries (text, day, time) VALUES (?, ?, ?)", rows
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("size", str(indexed)),
+                    ("day", day),
+                    ("fingerprint", fingerprint),
+                    ("inode", inode),
+                ],
+            )
+        return len(rows)
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[str, str, str]]:
+        """Best matches for every word of `query`, as `(day, time, text)` rows."""
+        # quote each word so punctuation isn't read as FTS5 query syntax
+        terms = " ".join(
+            '"{}"'.format(word.replace('"', '""')) for word in query.split()
+        )
+        return self.conn.execute(
+            "SELECT day, time, text FROM entries WHERE entries MATCH ? ORDER BY rank LIMIT ?",
+            (terms, limit),
+        ).fetchall()
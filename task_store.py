@@ -0,0 +1,151 @@
+"""Append-only JSON-lines storage for `hourly.Task` trees.
+
+Each line is one task with a reference to its parent, so finishing or editing a
+task appends a single line rather than re-serializing the whole forest. The
+last line for an id wins; `compact()` rewrites the file with one line per task
+once superseded lines make up most of it.
+"""
+
+from __future__ import annotations
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+
+import typing as tp
+
+# records are written with "id" first so it can be read without decoding the line
+_ID_RE = re.compile(rb'^\{"id": (\d+)')
+
+
+def _isoformat(value: tp.Union[datetime.datetime, str, None]) -> tp.Optional[str]:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class TaskRecord:
+    __slots__ = ("id", "parent", "text", "priority", "timestamp", "finished")
+
+    def __init__(
+        self,
+        id: int,  # pylint: disable=redefined-builtin
+        text: list[str],
+        parent: tp.Optional[int] = None,
+        priority: int = 0,
+        timestamp: tp.Optional[str] = None,
+        finished: tp.Optional[str] = None,
+    ):
+        self.id = id
+        self.parent = parent
+        self.text = text
+        self.priority = priority
+        self.timestamp = timestamp or datetime.datetime.now().isoformat()
+        self.finished = finished
+
+    def __repr__(self):
+        return f"TaskRecord({self.id}, {self.text!r}, parent={self.parent!r})"
+
+    def finish(self, note=None):
+        self.finished = datetime.datetime.now().isoformat()
+        if note:
+            self.text.append(note)
+
+    def to_json(self) -> str:
+        return json.dumps({name: getattr(self, name) for name in self.__slots__})
+
+
+class JsonlTaskStore:
+    # compact once the file has this many times more lines than live tasks
+    COMPACT_RATIO = 4
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lines: dict[int, bytes] = {}
+        self._records: dict[int, TaskRecord] = {}
+        self._n_lines = 0
+
+    def load(self) -> JsonlTaskStore:
+        """Index the latest line per id; lines are only decoded when accessed."""
+        self._lines.clear()
+        self._records.clear()
+        self._n_lines = 0
+        if self.path.exists():
+            with open(self.path, mode="rb") as f:
+                for line in f:
+                    match = _ID_RE.match(line)
+                    if match:
+                        self._lines[int(match.group(1))] = line
+                        self._n_lines += 1
+        return self
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self) -> tp.Iterator[TaskRecord]:
+        return (self[i] for i in list(self._lines))
+
+    def __getitem__(self, task_id: int) -> TaskRecord:
+        record = self._records.get(task_id)
+        if record is None:
+            record = self._records[task_id] = TaskRecord(
+                **json.loads(self._lines[task_id])
+            )
+        return record
+
+    def children(self, task_id: tp.Optional[int]) -> list[TaskRecord]:
+        return [record for record in self if record.parent == task_id]
+
+    def add(self, text: list[str], parent: tp.Optional[int] = None) -> TaskRecord:
+        record = TaskRecord(max(self._lines, default=0) + 1, text, parent=parent)
+        self.save(record)
+        return record
+
+    def save(self, record: TaskRecord) -> None:
+        """Persist `record` by appending one line."""
+        line = f"{record.to_json()}\n".encode()
+        with open(self.path, mode="ab") as f:
+            f.write(line)
+        self._lines[record.id] = line
+        self._records[record.id] = record
+        self._n_lines += 1
+        if self._n_lines > max(self.COMPACT_MIN_LINES, self.COMPACT_RATIO * len(self)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest line for each task."""
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp, mode="wb") as f:
+            f.writelines(self._lines.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._n_lines = len(self._lines)
+
+    @classmethod
+    def from_tasks(cls, path: Path, tasks: tp.Iterable[tp.Any]) -> JsonlTaskStore:
+        """Convert a forest of `hourly.Task` into a new store at `path`."""
+        store = cls(path)
+        path.write_bytes(b"")
+        stack = [(task, None) for task in reversed(list(tasks))]
+        next_id = 1
+        with open(path, mode="ab") as f:
+            while stack:
+                task, parent = stack.pop()
+                record = TaskRecord(
+                    next_id,
+                    list(task.text),
+                    parent,
+                    task.priority,
+                    _isoformat(task.timestamp),
+                    _isoformat(task.finished),
+                )
+                line = f"{record.to_json()}\n".encode()
+                f.write(line)
+                store._lines[record.id] = line
+                stack.extend((sub, record.id) for sub in reversed(task.subtasks))
+                next_id += 1
+        store._n_lines = len(store._lines)
+        return store
@@ -1,13 +1,26 @@
 from __future__ import annotations
-from functools import lru_cache
+from bisect import insort
+from dataclasses import dataclass
+import datetime
+from functools import lru_cache, wraps
 from pathlib import Path
+import random
+import sqlite3
+import time
+import typing as tp
 
 from contextlib import contextmanager, AbstractContextManager
 
-from sqlalchemy import Boolean, create_engine, Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, create_engine, Column, DateTime, Integer, String
+from sqlalchemy import FetchedValue, ForeignKey, Index
+from sqlalchemy import and_, delete, event, func, inspect, literal, select, text
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import aliased, relationship
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 
 # Create an engine
 
@@ -25,39 +38,321 @@ class Task(Base):
     done = Column(Boolean, default=False)
     priority = Column(Integer, default=0)
     issue_number = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True, default=datetime.datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    # identifies tasks brought in by `todo_import`, so re-imports update in place
+    source_key = Column(String, nullable=True, unique=True, index=True)
+    # `/<root id>/.../<id>/`, kept current by the triggers in `_PATH_TRIGGERS`
+    path = Column(String, server_default=FetchedValue(), server_onupdate=FetchedValue())
 
     subtasks = relationship("Task", order_by="asc(Task.done), asc(Task.priority)")
 
     def __repr__(self):
         return f"Task({self.id}, {self.description!r}, parent_id={self.parent_id!r})"
 
-    def format_tree(*tasks: Task) -> str:
-        print(tasks)
+    def iter_tree(
+        *tasks: Task,
+        max_depth: tp.Optional[int] = None,
+        hide_done: bool = False,
+        collapse: tp.Optional[int] = None,
+        progress: bool = True,
+    ) -> tp.Iterator[str]:
+        """Lines of the forest under `tasks`, depth first, from an explicit stack.
+
+        A task whose parent is also in `tasks` is shown under its parent only.
+        Children below `max_depth`, and subtrees of more than `collapse` tasks
+        below the roots, are summarized as counts. With `hide_done`, finished
+        tasks and everything under them are left out. With `progress`, tasks
+        that have subtasks show `[done/total]` over their whole subtree.
+        """
+        ids = {task.id for task in tasks}
+        roots = [task for task in tasks if task.parent_id not in ids]
+        sizes = _subtree_sizes(roots) if progress or collapse is not None else {}
         seen = set()
-
-        def _format_tree(task: Task, indent: int) -> str:
-            seen.add(task.id)
-            prefix = f"{' ' * indent}[{'x' if task.done else ' '}]"
-            main_task = f"{prefix} {task.id} {task.description}\n"
-            subtasks = "".join(
-                _format_tree(subtask, indent + 2) for subtask in task.subtasks
-            )
-            return main_task + subtasks
-
-        return "\n".join(_format_tree(task, 0) for task in tasks if task.id not in seen)
+        first = True
+        for root in roots:
+            if root.id in seen or (hide_done and root.done):
+                continue
+            if not first:
+                yield "\n"
+            first = False
+            stack = [(root, 0)]
+            while stack:
+                task, depth = stack.pop()
+                if task.id in seen:
+                    # a cycle in parent ids
+                    continue
+                seen.add(task.id)
+                children = [t for t in task.subtasks if not (hide_done and t.done)]
+                box = "x" if task.done else " "
+                line = f"{' ' * (2 * depth)}[{box}] {task.id} {task.description}"
+                if progress and task.subtasks:
+                    total, done = sizes[task.id]
+                    line += f" [{done}/{total}]"
+                if depth and collapse is not None and sizes[task.id][0] > collapse:
+                    total, done = sizes[task.id]
+                    yield f"{line} (+{total} in subtree, {done} done)\n"
+                elif children and max_depth is not None and depth >= max_depth:
+                    yield f"{line} (+{len(children)} subtasks)\n"
+                else:
+                    yield f"{line}\n"
+                    stack.extend((child, depth + 1) for child in reversed(children))
+
+    def write_tree(*tasks: Task, out: tp.TextIO, **options) -> None:
+        """Write `iter_tree(*tasks, **options)` to `out` as it is rendered."""
+        for line in Task.iter_tree(*tasks, **options):
+            out.write(line)
+
+    def format_tree(*tasks: Task, **options) -> str:
+        return "".join(Task.iter_tree(*tasks, **options))
 
     def prioritize(self) -> None:
         self.priority -= 1
 
 
+# parent lookups, already in `Task.subtasks` order
+Index("ix_tasks_parent_id", Task.parent_id, Task.done, Task.priority)
+# `TodoDB.tasks` order, and open roots by priority
+Index("ix_tasks_done_priority", Task.done, Task.priority.desc())
+# subtrees are the range `path >= '/1/5/' AND path < '/1/50'`
+Index("ix_tasks_path", Task.path)
+
+# '0' sorts right after the '/' that ends every path
+_PATH_END = "substr({path}, 1, length({path}) - 1) || '0'"
+_PATH_TRIGGERS = [
+    """
+    CREATE TRIGGER tasks_path_insert AFTER INSERT ON tasks BEGIN
+        UPDATE tasks SET path = coalesce(
+            (SELECT path FROM tasks WHERE id = NEW.parent_id), '/'
+        ) || NEW.id || '/'
+        WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER tasks_path_move AFTER UPDATE OF parent_id ON tasks
+    WHEN NEW.parent_id IS NOT OLD.parent_id BEGIN
+        UPDATE tasks SET path = coalesce(
+            (SELECT path FROM tasks WHERE id = NEW.parent_id), '/'
+        ) || NEW.id || '/' || substr(path, length(OLD.path) + 1)
+        WHERE path >= OLD.path AND path < {_PATH_END.format(path="OLD.path")};
+    END
+    """,
+]
+
+
+@contextmanager
+def paths_deferred(conn) -> tp.Iterator[None]:
+    """Suspend the per-row path trigger while bulk-inserting top-level tasks.
+
+    Rows inserted in the block get root paths on exit, in one UPDATE. Give them
+    parents afterwards by updating `parent_id`, which `tasks_path_move` handles.
+    """
+    conn.exec_driver_sql("DROP TRIGGER tasks_path_insert")
+    try:
+        yield
+        conn.exec_driver_sql(
+            "UPDATE tasks SET path = '/' || id || '/' WHERE path IS NULL"
+        )
+    finally:
+        conn.exec_driver_sql(_PATH_TRIGGERS[0])
+
+
+def _tree_order(task: Task) -> tuple[bool, int]:
+    """Sort key of `TodoDB.tasks`: open first, then by descending priority."""
+    return task.done, -task.priority
+
+
+# `PRAGMA data_version` as a column, so it can ride along with another SELECT
+_DATA_VERSION = (
+    select(text("data_version"))
+    .select_from(text("pragma_data_version"))
+    .scalar_subquery()
+)
+
+
+def _link(tasks: list[Task]) -> list[Task]:
+    """Populate `subtasks` from the parents within `tasks`, without querying."""
+    children: dict[int, list[Task]] = {task.id: [] for task in tasks}
+    for task in tasks:
+        if task.parent_id in children:
+            children[task.parent_id].append(task)
+    for task in tasks:
+        # same order as the `subtasks` relationship
+        subtasks = sorted(children[task.id], key=lambda t: (t.done, t.priority))
+        set_committed_value(task, "subtasks", subtasks)
+    return tasks
+
+
+def _subtree(anchor_ids: tp.Iterable[int]):
+    """SELECT of every task id under (and including) any of `anchor_ids`."""
+    anchor = aliased(Task)
+    end = func.substr(anchor.path, 1, func.length(anchor.path) - 1).op("||")("0")
+    return (
+        select(Task.id)
+        .join(anchor, and_(Task.path >= anchor.path, Task.path < end))
+        .where(anchor.id.in_(list(anchor_ids)))
+    )
+
+
+def _subtree_sizes(roots: tp.Iterable[Task]) -> dict[int, tuple[int, int]]:
+    """`(descendants, finished descendants)` per task id, computed bottom up."""
+    sizes: dict[int, tuple[int, int]] = {}
+    stack = [(root, False) for root in roots]
+    while stack:
+        task, children_done = stack.pop()
+        children = task.subtasks
+        if children_done:
+            total = done = 0
+            for child in children:
+                child_total, child_done = sizes[child.id]
+                total += 1 + child_total
+                done += child.done + child_done
+            sizes[task.id] = (total, done)
+        elif task.id not in sizes:
+            # placeholder until the children are counted; also stops cycles
+            sizes[task.id] = (0, 0)
+            stack.append((task, True))
+            stack.extend((child, False) for child in children)
+    return sizes
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """SQLite pragmas applied to every new connection."""
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 64 * 2**20
+    # negative values are in KiB
+    cache_size: int = -16_000
+    busy_timeout: int = 5_000  # ms
+
+    def pragmas(self) -> dict[str, tp.Union[str, int]]:
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "mmap_size": self.mmap_size,
+            "cache_size": self.cache_size,
+            "busy_timeout": self.busy_timeout,
+        }
+
+
+DEFAULT_PROFILE = EngineProfile()
+
+# Stored in `PRAGMA user_version`. Files created before versioning read as 0 and
+# have the version 1 schema; `_MIGRATIONS[v]` upgrades a file from v - 1 to v.
+SCHEMA_VERSION = 4
+_MIGRATIONS: dict[int, list[str]] = {
+    2: [
+        "ALTER TABLE tasks ADD COLUMN created_at DATETIME",
+        "ALTER TABLE tasks ADD COLUMN finished_at DATETIME",
+        "ALTER TABLE tasks ADD COLUMN source_key VARCHAR",
+        "CREATE UNIQUE INDEX ix_tasks_source_key ON tasks (source_key)",
+    ],
+    3: [
+        "CREATE INDEX ix_tasks_parent_id ON tasks (parent_id, done, priority)",
+        "CREATE INDEX ix_tasks_done_priority ON tasks (done, priority DESC)",
+        "ANALYZE",
+    ],
+    4: [
+        "ALTER TABLE tasks ADD COLUMN path VARCHAR",
+        # tasks whose parent is missing are treated as roots
+        """
+        CREATE TEMP TABLE task_paths AS
+        WITH RECURSIVE paths(id, path) AS (
+            SELECT id, '/' || id || '/' FROM tasks
+            WHERE parent_id IS NULL OR parent_id NOT IN (SELECT id FROM tasks)
+            UNION ALL
+            SELECT tasks.id, paths.path || tasks.id || '/'
+            FROM tasks JOIN paths ON tasks.parent_id = paths.id
+        )
+        SELECT id, path FROM paths
+        """,
+        "CREATE UNIQUE INDEX temp.ix_task_paths_id ON task_paths (id)",
+        "UPDATE tasks SET path = (SELECT path FROM task_paths WHERE id = tasks.id)",
+        "DROP TABLE temp.task_paths",
+        "CREATE INDEX ix_tasks_path ON tasks (path)",
+        *_PATH_TRIGGERS,
+    ],
+}
+
+
+def _ensure_schema(engine) -> None:
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION:
+            return
+        conn.rollback()
+        # take the write lock before checking again, so two processes opening an
+        # old file don't both upgrade it
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version == SCHEMA_VERSION:
+            conn.rollback()
+            return
+        if version == 0 and not inspect(conn).has_table(Task.__tablename__):
+            Base.metadata.create_all(conn)
+            for statement in _PATH_TRIGGERS:
+                conn.exec_driver_sql(statement)
+        else:
+            for v in range(max(version, 1) + 1, SCHEMA_VERSION + 1):
+                for statement in _MIGRATIONS[v]:
+                    conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+
+# SQL statements sent by every engine in this process, reported by `log_metrics`
+_statement_count = 0
+
+
+def statement_count() -> int:
+    return _statement_count
+
+
+def _count_statements(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(*_):
+        global _statement_count
+        _statement_count += 1
+
+
 @lru_cache(4)
-def _get_sessionmaker(fp: Path) -> sessionmaker:
+def _get_sessionmaker(
+    fp: Path, profile: EngineProfile = DEFAULT_PROFILE
+) -> sessionmaker:
     engine = create_engine(f"sqlite:///{fp.resolve()}", echo=False)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in profile.pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    _count_statements(engine)
+
+    _ensure_schema(engine)
+    # `TodoDB` keeps its tasks across commits and updates them itself
+    return sessionmaker(bind=engine, expire_on_commit=False)
 
 
-# Create the tables
+def get_engine(fp: Path, profile: EngineProfile = DEFAULT_PROFILE):
+    """The shared engine for `fp`, for Core statements that bypass the ORM."""
+    return _get_sessionmaker(fp, profile).kw["bind"]
+
+
+def dispose(
+    fp: Path, profile: EngineProfile = DEFAULT_PROFILE, *, reset: bool = False
+) -> None:
+    """Close pooled connections to `fp`, checkpointing the WAL so the file can move.
+
+    With `reset`, cached engines are dropped too, so the next `TodoDB` checks the
+    schema of whatever file is at `fp` by then, e.g. the empty one `ROTATE_TODO`
+    leaves behind.
+    """
+    get_engine(fp, profile).dispose()
+    if reset:
+        _get_sessionmaker.cache_clear()
 
 
 @contextmanager
@@ -74,13 +369,62 @@ def _session_scope(fp: Path):
         session.close()
 
 
+# seconds to wait before each retry once SQLite's `busy_timeout` has run out
+LOCKED_RETRY_DELAYS = (0.05, 0.2, 0.5, 1.0)
+
+
+def _is_locked(error: OperationalError) -> bool:
+    return "database is locked" in str(error.orig)
+
+
+def _retry_locked(method):
+    """Retry a `TodoDB` write with backoff while another process holds the lock.
+
+    The transaction is rolled back before each retry, which is only safe while
+    it holds no other changes; otherwise the error is raised as is.
+    """
+
+    @wraps(method)
+    def wrapper(self: TodoDB, *args, **kwargs):
+        # every attempt must see the same ids, so one-shot iterators are read up front
+        args = tuple(list(a) if isinstance(a, tp.Iterator) else a for a in args)
+        kwargs = {
+            k: list(v) if isinstance(v, tp.Iterator) else v for k, v in kwargs.items()
+        }
+        for delay in (*LOCKED_RETRY_DELAYS, None):
+            session = self.session
+            pending = self._wrote or session.new or session.dirty or session.deleted
+            try:
+                result = method(self, *args, **kwargs)
+            except OperationalError as e:
+                if delay is None or pending or not _is_locked(e):
+                    raise
+                session.rollback()
+                # the rollback expired every task
+                self._tree = None
+                time.sleep(delay * random.uniform(1, 1.5))
+            else:
+                self._wrote = True
+                return result
+
+    return wrapper
+
+
 class TodoDB(AbstractContextManager):
-    def __init__(self, fp: Path):
+    def __init__(self, fp: Path, profile: EngineProfile = DEFAULT_PROFILE):
         self.fp = fp
+        self.profile = profile
         self._session = None
+        # every task, linked, once `load_tree` has run; kept in step by the methods
+        # below so later renders don't query
+        self._tree: tp.Optional[list[Task]] = None
+        # `_data_version()` when `_tree` was loaded
+        self._tree_version: tp.Optional[tuple[int, int]] = None
+        # whether the open transaction has written, see `_retry_locked`
+        self._wrote = False
 
     def __enter__(self):
-        self._session = _get_sessionmaker(self.fp)()
+        self._session = _get_sessionmaker(self.fp, self.profile)()
         return self
 
     @property
@@ -97,38 +441,398 @@ class TodoDB(AbstractContextManager):
         else:
             self.session.rollback()
         self.session.close()
+        self._tree = None
+        self._wrote = False
 
     @property
     def tasks(self):
         return self.session.query(Task).order_by(Task.done, Task.priority.desc()).all()
 
+    def load_tree(self) -> list[Task]:
+        """Fetch every task in one query and link `subtasks` in memory.
+
+        Returns the tasks in `tasks` order with each `subtasks` collection already
+        populated, so rendering the tree issues no further SELECTs. The result is
+        cached for the life of the session and kept current by this class's
+        methods, and loaded again once another process has committed; call
+        `invalidate` after changing tasks any other way.
+        """
+        if not self._tree_is_current():
+            # read the version in the same statement, so no commit can slip between
+            rows = (
+                self.session.query(Task, _DATA_VERSION)
+                .order_by(Task.done, Task.priority.desc())
+                .all()
+            )
+            if rows:
+                conn = self.session.connection()
+                self._tree_version = id(conn.connection.dbapi_connection), rows[0][1]
+            else:
+                self._tree_version = self._data_version()
+            self._tree = _link([task for task, _ in rows])
+        return self._tree
+
+    def _tree_is_current(self) -> bool:
+        """Whether `_tree` is loaded and no other process has committed since."""
+        if self._tree is None:
+            return False
+        if self._data_version() != self._tree_version:
+            self.invalidate()
+            return False
+        return True
+
+    def _data_version(self) -> tuple[int, int]:
+        """Changes whenever another connection commits to the file.
+
+        SQLite's `data_version` counts per connection, so it is paired with one.
+        """
+        conn = self.session.connection()
+        version = conn.exec_driver_sql("PRAGMA data_version").scalar()
+        return id(conn.connection.dbapi_connection), version
+
+    def invalidate(self) -> None:
+        """Drop every cached task, so the next read goes to the database."""
+        self._tree = None
+        self.session.expire_all()
+
+    def _relink(
+        self,
+        changed: tp.Iterable[Task] = (),
+        added: tp.Iterable[Task] = (),
+        parent_ids: tp.Iterable[tp.Optional[int]] = (),
+    ) -> None:
+        """Bring the cached tree up to date after tasks changed in memory.
+
+        Only the `subtasks` of the parents of `changed` and `added` tasks, and of
+        `parent_ids`, are rebuilt; deleted tasks are left out of them.
+        """
+        if self._tree is None:
+            return
+        changed, added = list(changed), list(added)
+        for task in added:
+            set_committed_value(task, "subtasks", [])
+        # move only the tasks whose order may have changed, rather than sorting all
+        for task in changed:
+            try:
+                self._tree.remove(task)
+            except ValueError:
+                pass
+        for task in changed + added:
+            insort(self._tree, task, key=_tree_order)
+        touched = changed + added
+        parent_ids = {*parent_ids, *(task.parent_id for task in touched)}
+        for parent_id in parent_ids - {None}:
+            parent = self.session.identity_map.get(identity_key(Task, parent_id))
+            if parent is None:
+                continue
+            subtasks = [
+                t
+                for t in parent.subtasks
+                if t.parent_id == parent_id and not inspect(t).deleted
+            ]
+            subtasks += [
+                t for t in touched if t.parent_id == parent_id and t not in subtasks
+            ]
+            subtasks.sort(key=lambda t: (t.done, t.priority))
+            set_committed_value(parent, "subtasks", subtasks)
+
+    def load_subtree(self, task_id: int) -> list[Task]:
+        """Like `load_tree`, for task `task_id` and its descendants only."""
+        return _link(
+            self.session.query(Task)
+            .filter(Task.id.in_(_subtree([task_id])))
+            .order_by(Task.done, Task.priority.desc())
+            .all()
+        )
+
+    def open_descriptions(self) -> list[tuple[int, str]]:
+        """`(id, description)` of every unfinished task, without loading `Task`s."""
+        return (
+            self.session.query(Task.id, Task.description)
+            .filter(Task.done.is_(False))
+            .all()
+        )
+
+    def open_roots(self) -> list[tuple[Task, int]]:
+        """Unfinished top-level tasks by priority, each with its open descendant count.
+
+        Descendants are counted through open tasks only, since a finished task
+        closes its subtree. One query, walking `ix_tasks_parent_id`.
+        """
+        subtree = (
+            select(Task.id.label("root_id"), Task.id.label("id"))
+            .where(Task.parent_id.is_(None), Task.done.is_(False))
+            .cte("subtree", recursive=True)
+        )
+        subtree = subtree.union_all(
+            select(subtree.c.root_id, Task.id).where(
+                Task.parent_id == subtree.c.id, Task.done.is_(False)
+            )
+        )
+        rows = (
+            self.session.query(Task, func.count() - 1)
+            .join(subtree, subtree.c.root_id == Task.id)
+            .group_by(Task.id)
+            .order_by(Task.priority.desc())
+        )
+        return [(task, n_open) for task, n_open in rows]
+
+    @_retry_locked
     def add_task(self, description: str, parent_id=None) -> Task:
         task = Task(description=description, parent_id=parent_id)
         self.session.add(task)
+        self.session.flush()
+        # RETURNING ran before the path trigger; load the real path when read
+        self.session.expire(task, ["path"])
+        self._relink(added=[task])
         return task
 
+    @_retry_locked
+    def add_tasks(
+        self, descriptions: tp.Collection[str], parent_id: tp.Optional[int] = None
+    ) -> list[Task]:
+        tasks = [Task(description=d, parent_id=parent_id) for d in descriptions]
+        self.session.add_all(tasks)
+        self.session.flush()
+        for task in tasks:
+            self.session.expire(task, ["path"])
+        self._relink(added=tasks)
+        return tasks
+
+    def get_many(self, task_ids: tp.Collection[int]) -> list[Task]:
+        """The tasks with these ids, querying only for those not already loaded."""
+        identity_map = self.session.identity_map
+        loaded, missing = [], []
+        for task_id in task_ids:
+            task = identity_map.get(identity_key(Task, task_id))
+            if task is None:
+                missing.append(task_id)
+            else:
+                loaded.append(task)
+        if missing:
+            loaded += self.session.query(Task).filter(Task.id.in_(missing)).all()
+        return loaded
+
+    @_retry_locked
+    def _update_many(self, task_ids: tp.Collection[int], **values) -> list[Task]:
+        """UPDATE the tasks, copying the new values onto those already loaded.
+
+        Uses RETURNING rather than `synchronize_session="evaluate"`, which would
+        test every task in the session against the WHERE clause.
+        """
+        task_ids = list(task_ids)
+        rows = self.session.execute(
+            update(Task)
+            .where(Task.id.in_(task_ids))
+            .values(**values)
+            .returning(Task.id, *(getattr(Task, name) for name in values))
+            .execution_options(synchronize_session=False)
+        )
+        identity_map = self.session.identity_map
+        for task_id, *new_values in rows:
+            task = identity_map.get(identity_key(Task, task_id))
+            if task is not None:
+                for name, value in zip(values, new_values):
+                    set_committed_value(task, name, value)
+        tasks = self.get_many(task_ids)
+        self._relink(tasks)
+        return tasks
+
+    def set_issue_number(self, task_id: int, issue_number: int) -> Task:
+        tasks = self._update_many([task_id], issue_number=issue_number)
+        if not tasks:
+            raise ValueError(f"No task {task_id}")
+        return tasks[0]
+
+    def mark_done_many(self, task_ids: tp.Collection[int]) -> list[Task]:
+        return self._update_many(
+            task_ids, done=True, finished_at=datetime.datetime.now()
+        )
+
+    def reprioritize_many(
+        self, task_ids: tp.Collection[int], priority: tp.Optional[int] = None
+    ) -> list[Task]:
+        """Set the priority of every task, or bump each by one if `priority` is None."""
+        new_priority = Task.priority + 1 if priority is None else priority
+        return self._update_many(task_ids, priority=new_priority)
+
+    @_retry_locked
+    def delete_many(self, task_ids: tp.Collection[int]) -> list[int]:
+        """Delete the tasks and all of their subtasks, returning the ids deleted."""
+        deleted_ids = (
+            self.session.execute(
+                delete(Task)
+                .where(Task.id.in_(_subtree(task_ids)))
+                .returning(Task.id)
+                .execution_options(synchronize_session="fetch")
+            )
+            .scalars()
+            .all()
+        )
+        if self._tree is not None:
+            gone = set(deleted_ids)
+            kept, deleted = [], []
+            for task in self._tree:
+                (deleted if task.id in gone else kept).append(task)
+            self._tree = kept
+            self._relink(parent_ids=(task.parent_id for task in deleted))
+        return deleted_ids
+
+    @_retry_locked
+    def reparent(self, task_id: int, parent_id: tp.Optional[int]) -> None:
+        """Move a task and its subtree under `parent_id`, or to the top level if None.
+
+        One UPDATE; the `tasks_path_move` trigger rewrites the subtree's paths.
+        """
+        stmt = update(Task).where(Task.id == task_id).values(parent_id=parent_id)
+        if parent_id is not None:
+            # the new parent must exist and not be in the moved subtree
+            parent = aliased(Task)
+            stmt = stmt.where(
+                select(parent.id).where(parent.id == parent_id).exists(),
+                literal(parent_id).not_in(_subtree([task_id])),
+            )
+        result = self.session.execute(stmt.execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            raise ValueError(f"Can't move task {task_id} under {parent_id}")
+        moved = self.session.identity_map.get(identity_key(Task, task_id))
+        old_parent_id = None
+        if moved is not None:
+            old_parent_id = moved.parent_id
+            set_committed_value(moved, "parent_id", parent_id)
+        for task in list(self.session.identity_map.values()):
+            if isinstance(task, Task):
+                # paths under the moved task changed; nothing renders them
+                self.session.expire(task, ["path"])
+                if self._tree is None:
+                    self.session.expire(task, ["subtasks"])
+        if moved is not None:
+            self._relink([moved], parent_ids=[old_parent_id])
+
     def mark_done(self, task_id: int) -> Task:
-        task = self.session.query(Task).get(task_id)
+        task = self[task_id]
         task.done = True
+        task.finished_at = datetime.datetime.now()
+        self._relink([task])
         return task
 
     def prioritize(self, task_id: int) -> Task:
-        task = self.session.query(Task).get(task_id)
+        task = self[task_id]
         task.prioritize()
+        self._relink([task])
         return task
 
     def show_task(self, idx) -> str:
-        return self[idx].format_tree() if idx else str(self)
+        return "".join(self.iter_task(idx))
+
+    def iter_task(self, idx: tp.Optional[int] = None, **options) -> tp.Iterator[str]:
+        """Lines of task `idx` and its subtasks, or of every task; see `Task.iter_tree`."""
+        if not idx:
+            tasks = self.load_tree()
+        elif self._tree_is_current():
+            # rendering from the cached tree needs only the task itself
+            tasks = [task for task in self._tree if task.id == idx]
+        else:
+            tasks = self.load_subtree(idx)
+        if not tasks:
+            return iter([f"No task {idx}\n"] if idx else [])
+        return Task.iter_tree(*tasks, **options)
 
     def delete_task(self, idx):
-        task = self.session.query(Task).get(idx)
-        self.session.delete(task)
+        self.delete_many([idx])
 
     def __getitem__(self, idx):
-        return self.session.query(Task).get(idx)
+        # from the identity map when already loaded
+        return self.session.get(Task, idx)
 
     def __str__(self):
-        return Task.format_tree(*self.tasks)
+        return Task.format_tree(*self.load_tree())
 
     def commit(self):
         self.session.commit()
+        self._wrote = False
+
+
+class ArchivedTask(tp.NamedTuple):
+    generation: int
+    id: int
+    description: str
+    parent_id: tp.Optional[int]
+    done: bool
+    priority: int
+    issue_number: tp.Optional[int]
+
+    def __str__(self):
+        return f"{self.generation:>3} {self.id:>5} [{'x' if self.done else ' '}] {self.description}"
+
+
+# columns every schema version has, so old backups can be read alongside new ones
+_ARCHIVE_COLUMNS = "id, description, parent_id, done, priority, issue_number"
+
+
+class TodoArchive(AbstractContextManager):
+    """Read-only view over the todo DB and its rotated backups, in one connection.
+
+    `paths` maps a generation to its file: 0 for the live DB, N for backup `.N`.
+    The first file is opened as `main` and the others ATTACHed read-only, which
+    SQLite allows for up to 10, so the live DB and `.1`-`.10` fit. Lookups are
+    one `UNION ALL` over every file's own `tasks`, using its indexes. Task ids
+    restart in each generation, so a task is identified by `(generation, id)`.
+    """
+
+    def __init__(self, paths: tp.Mapping[int, Path]):
+        self.paths = {gen: p for gen, p in sorted(paths.items()) if p.exists()}
+        self._conn = None
+        # generation -> schema name, for the files that have a `tasks` table
+        self._schemas: dict[int, str] = {}
+
+    def __enter__(self):
+        uris = {gen: f"file:{p.resolve()}?mode=ro" for gen, p in self.paths.items()}
+        main = next(iter(uris.values()), ":memory:")
+        engine = create_engine(
+            "sqlite://", creator=lambda: sqlite3.connect(main, uri=True)
+        )
+        _count_statements(engine)
+        self._conn = engine.connect()
+        for i, (gen, uri) in enumerate(uris.items()):
+            schema = "main" if i == 0 else f"gen{gen}"
+            if schema != "main":
+                self._conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            # an empty file, e.g. the live DB right after ROTATE_TODO, has no schema
+            if self._conn.exec_driver_sql(
+                f"SELECT 1 FROM {schema}.sqlite_master"
+                " WHERE type = 'table' AND name = 'tasks'"
+            ).first():
+                self._schemas[gen] = schema
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._conn.close()
+
+    def _query(self, where: str, params: dict) -> list[ArchivedTask]:
+        if not self._schemas:
+            return []
+        selects = " UNION ALL ".join(
+            f"SELECT {gen} AS generation, {_ARCHIVE_COLUMNS}"
+            f" FROM {schema}.tasks WHERE {where}"
+            for gen, schema in self._schemas.items()
+        )
+        rows = self._conn.execute(
+            text(f"{selects} ORDER BY generation, done, priority DESC"), params
+        )
+        return [ArchivedTask._make(row)._replace(done=bool(row.done)) for row in rows]
+
+    def search(self, words: str) -> list[ArchivedTask]:
+        """Tasks in any generation whose description contains `words`, ignoring case."""
+        return self._query(
+            "description LIKE :pattern ESCAPE '\\'",
+            {"pattern": "%" + _escape_like(words) + "%"},
+        )
+
+    def get(self, task_id: int) -> list[ArchivedTask]:
+        """Task `task_id` in every generation that has one, by primary key."""
+        return self._query("id = :id", {"id": task_id})
+
+
+def _escape_like(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,250 @@
+"""Bulk import of legacy todos into the SQLite `TodoDB`.
+
+Two sources are understood:
+
+* the markdown log written by `hourly.py`, where a todo is a `[ ] text # HH:MM`
+  line under a day header and finishing it rewrites the box to `[HH:MM]`
+  (yearly `.gz` archives from `log_archive` are read the same way);
+* `hourly.Task` JSON, either the whole-file list with nested `subtasks` or the
+  `task_store` JSON-lines file with parent ids.
+
+Sources are scanned as generators and written with batched Core inserts in a
+single transaction. Every row carries a `source_key` derived from where it came
+from, and a conflicting key only marks the existing row finished if its source
+now is, so importing the same files again leaves the database unchanged apart
+from newly finished todos, and keeps what was changed in the REPL since.
+"""
+
+from __future__ import annotations
+import datetime
+import gzip
+import json
+import re
+import time
+from pathlib import Path
+
+import typing as tp
+
+from log_file import parse_day_header
+from todo_db import DEFAULT_PROFILE, EngineProfile, get_engine, paths_deferred
+
+# `[ ] text # HH:MM`, or `[HH:MM] text # HH:MM - note` once finished
+LOG_TODO_RE = re.compile(rb"^\[( |(\d{1,2}):(\d{2}))\] (.*)")
+ADDED_RE = re.compile(rb"(\d{1,2}):(\d{2})(?: - (.*))?$")
+
+BATCH_SIZE = 10_000
+
+
+class ImportRow(tp.NamedTuple):
+    source_key: str
+    description: str
+    done: bool
+    priority: int = 0
+    created_at: tp.Optional[datetime.datetime] = None
+    finished_at: tp.Optional[datetime.datetime] = None
+    parent_key: tp.Optional[str] = None
+
+
+def _at(day: datetime.date, hour: bytes, minute: bytes) -> datetime.datetime:
+    return datetime.datetime(day.year, day.month, day.day, int(hour), int(minute))
+
+
+def _open_lines(path: Path) -> tp.BinaryIO:
+    return gzip.open(path, mode="rb") if path.suffix == ".gz" else open(path, mode="rb")
+
+
+def scan_log(path: Path) -> tp.Iterator[ImportRow]:
+    """Todo lines of a markdown log, keyed by day, text and occurrence that day."""
+    day = None
+    seen: dict[bytes, int] = {}
+    with _open_lines(path) as f:
+        for line in f:
+            if line.startswith(b"---"):
+                header_day = parse_day_header(line)
+                if header_day is not None:
+                    day = header_day
+                    key_prefix = f"log:{day:%Y-%m-%d}"
+                    seen.clear()
+                continue
+            if day is None or not line.startswith(b"["):
+                continue
+            match = LOG_TODO_RE.match(line)
+            if match is None:
+                continue
+            box, fin_h, fin_m, text = match.groups()
+            text = text.rstrip()
+            add_h = add_m = note = None
+            head, sep, tail = text.rpartition(b" # ")
+            if sep and (added := ADDED_RE.match(tail)):
+                text = head
+                add_h, add_m, note = added.groups()
+            # the same todo can be written twice in a day; keep both
+            n = seen[text] = seen.get(text, 0) + 1
+            description = text.decode(errors="replace")
+            if note:
+                description += " - " + note.decode(errors="replace")
+            finished = box != b" "
+            yield ImportRow(
+                f"{key_prefix}:{n}:{text.decode(errors='replace')}",
+                description,
+                finished,
+                0,
+                _at(day, add_h, add_m) if add_h else None,
+                _at(day, fin_h, fin_m) if finished else None,
+            )
+
+
+def _parse_timestamp(value: tp.Optional[str]) -> tp.Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def _task_row(d: dict, key: str, parent_key: tp.Optional[str]) -> ImportRow:
+    finished = _parse_timestamp(d.get("finished"))
+    return ImportRow(
+        source_key=key,
+        description=" - ".join(d["text"]),
+        done=finished is not None,
+        priority=d.get("priority", 0),
+        created_at=_parse_timestamp(d.get("timestamp")),
+        finished_at=finished,
+        parent_key=parent_key,
+    )
+
+
+def scan_json(path: Path) -> tp.Iterator[ImportRow]:
+    """Tasks of an `hourly.Task` JSON list, parents before their subtasks."""
+    with open(path) as f:
+        tasks = json.load(f)
+    prefix = f"json:{path.name}"
+    stack = [(d, f"{prefix}:{i}", None) for i, d in reversed(list(enumerate(tasks)))]
+    while stack:
+        d, key, parent_key = stack.pop()
+        yield _task_row(d, key, parent_key)
+        subtasks = d.get("subtasks") or []
+        stack.extend(
+            (sub, f"{key}.{i}", key) for i, sub in reversed(list(enumerate(subtasks)))
+        )
+
+
+def scan_jsonl(path: Path) -> tp.Iterator[ImportRow]:
+    """Tasks of a `task_store.JsonlTaskStore` file; the last line per id wins."""
+    latest: dict[int, dict] = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                latest[d["id"]] = d
+    prefix = f"jsonl:{path.name}"
+    for task_id, d in latest.items():
+        parent = d.get("parent")
+        parent_key = None if parent is None else f"{prefix}:{parent}"
+        yield _task_row(d, f"{prefix}:{task_id}", parent_key)
+
+
+def scan(path: Path) -> tp.Iterator[ImportRow]:
+    """Pick the scanner for `path` by its suffix."""
+    if path.suffix == ".jsonl":
+        return scan_jsonl(path)
+    if path.suffix == ".json":
+        return scan_json(path)
+    return scan_log(path)
+
+
+_UPSERT = """
+    INSERT INTO tasks
+        (source_key, description, done, priority, created_at, finished_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (source_key) DO UPDATE SET
+        done = tasks.done OR excluded.done,
+        created_at = excluded.created_at,
+        finished_at = coalesce(tasks.finished_at, excluded.finished_at)
+"""
+
+
+def _sql_datetime(value: tp.Optional[datetime.datetime]) -> tp.Optional[str]:
+    # the storage format of SQLAlchemy's SQLite DateTime
+    return value and value.isoformat(" ", "microseconds")
+
+
+def _batches(rows: tp.Iterable[ImportRow], size: int) -> tp.Iterator[list[ImportRow]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _print_progress(n_rows: int, elapsed: float) -> None:
+    print(f"{n_rows:>10} todos  {n_rows / max(elapsed, 1e-9):>10.0f}/s")
+
+
+def import_rows(
+    fp: Path,
+    rows: tp.Iterable[ImportRow],
+    *,
+    batch_size: int = BATCH_SIZE,
+    progress: tp.Optional[tp.Callable[[int, float], None]] = _print_progress,
+    profile: EngineProfile = DEFAULT_PROFILE,
+) -> int:
+    """Upsert `rows` into the todo DB at `fp` in one transaction.
+
+    Rows are sent with one `executemany` per batch; `parent_key` links are
+    resolved at the end with a single UPDATE through a TEMP table, so parents
+    may be imported after their subtasks. Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    n_rows = 0
+    with get_engine(fp, profile).begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TEMP TABLE IF NOT EXISTS import_links"
+            " (source_key TEXT PRIMARY KEY, parent_key TEXT NOT NULL)"
+        )
+        conn.exec_driver_sql("DELETE FROM import_links")
+        # new rows are inserted without parents; links are set below
+        with paths_deferred(conn):
+            for batch in _batches(rows, batch_size):
+                # straight to the driver: compiling and type-processing each
+                # row through SQLAlchemy costs several times more than the INSERT
+                conn.exec_driver_sql(
+                    _UPSERT,
+                    [
+                        (
+                            row.source_key,
+                            row.description,
+                            row.done,
+                            row.priority,
+                            _sql_datetime(row.created_at),
+                            _sql_datetime(row.finished_at),
+                        )
+                        for row in batch
+                    ],
+                )
+                links = [
+                    (row.source_key, row.parent_key) for row in batch if row.parent_key
+                ]
+                if links:
+                    conn.exec_driver_sql(
+                        "INSERT OR REPLACE INTO import_links VALUES (?, ?)", links
+                    )
+                n_rows += len(batch)
+                if progress is not None:
+                    progress(n_rows, time.perf_counter() - start)
+        conn.exec_driver_sql("""
+            UPDATE tasks SET parent_id = (
+                SELECT parent.id FROM import_links
+                JOIN tasks AS parent ON parent.source_key = import_links.parent_key
+                WHERE import_links.source_key = tasks.source_key
+            )
+            WHERE source_key IN (SELECT source_key FROM import_links)
+            """)
+        conn.exec_driver_sql("DROP TABLE import_links")
+    return n_rows
+
+
+def import_files(fp: Path, paths: tp.Iterable[Path], **kwargs) -> int:
+    """Import every todo found in `paths` into the todo DB at `fp`."""
+    rows = (row for path in paths for row in scan(path))
+    return import_rows(fp, rows, **kwargs)